@@ -0,0 +1,47 @@
+"""generation jobs
+
+Revision ID: 0b9d3e7f5a18
+Revises: f1c4a8e2d736
+Create Date: 2025-01-03 15:21:08.114392
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9d3e7f5a18'
+down_revision: Union[str, None] = 'f1c4a8e2d736'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # init_db's create_all already creates the table on a new database
+    if not sa.inspect(op.get_bind()).has_table('generation_jobs'):
+        op.create_table(
+            'generation_jobs',
+            sa.Column('id', sa.Uuid(), nullable=False),
+            sa.Column('topic', sa.String(), nullable=False),
+            sa.Column('status', sa.String(), nullable=False),
+            sa.Column('short_id', sa.String(length=8), nullable=False),
+            sa.Column('languages', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+            sa.Column('error', sa.String(), nullable=True),
+            sa.Column('created', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('updated', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+    op.create_index(
+        'ix_generation_jobs_status_created',
+        'generation_jobs',
+        ['status', 'created'],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generation_jobs_status_created', table_name='generation_jobs', if_exists=True)
+    op.drop_table('generation_jobs')
@@ -0,0 +1,40 @@
+"""articles homepage index
+
+Revision ID: 5c0e3b9a7d21
+Revises: a23f1dffc9d8
+Create Date: 2024-12-20 10:12:44.118273
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e3b9a7d21'
+down_revision: Union[str, None] = 'a23f1dffc9d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_articles_lang_id_published_id",
+            "articles",
+            ["lang_id", "published", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_articles_lang_id_published_id",
+            table_name="articles",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,30 @@
+"""article status
+
+Revision ID: 7d2a5c9e4f60
+Revises: 0b9d3e7f5a18
+Create Date: 2025-01-06 09:42:17.503861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2a5c9e4f60'
+down_revision: Union[str, None] = '0b9d3e7f5a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # a constant default is stored in the catalog, so existing rows become 'ready' without
+    # a table rewrite. IF NOT EXISTS: init_db's create_all already adds it on a new database
+    op.execute(
+        "ALTER TABLE articles ADD COLUMN IF NOT EXISTS status VARCHAR NOT NULL DEFAULT 'ready'"
+    )
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE articles DROP COLUMN IF EXISTS status')
@@ -0,0 +1,41 @@
+"""article_keywords keyword index
+
+Revision ID: 8e41d6c2f0ab
+Revises: 5c0e3b9a7d21
+Create Date: 2024-12-20 14:37:02.904511
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41d6c2f0ab'
+down_revision: Union[str, None] = '5c0e3b9a7d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the (article_id, keyword_id) primary key cannot serve lookups by keyword_id alone;
+    # keywords.keyword is already covered by its unique constraint
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_article_keywords_keyword_id",
+            "article_keywords",
+            ["keyword_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_article_keywords_keyword_id",
+            table_name="article_keywords",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
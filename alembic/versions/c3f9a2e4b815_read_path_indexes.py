@@ -0,0 +1,46 @@
+"""read path indexes
+
+Revision ID: c3f9a2e4b815
+Revises: 8e41d6c2f0ab
+Create Date: 2024-12-21 09:48:15.530112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f9a2e4b815'
+down_revision: Union[str, None] = '8e41d6c2f0ab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Lookups that are already served by an existing index are not duplicated:
+#   articles.lang_id, articles(lang_id, published) -> ix_articles_lang_id_published_id
+#   articles.short_id                              -> ix_articles_short_id_lang_id (prefix)
+#   article_keywords.article_id                    -> primary key (article_id, keyword_id)
+#   keywords.keyword                               -> unique constraint
+INDEXES = [
+    ("ix_articles_short_id_lang_id", "articles", ["short_id", "lang_id"]),
+    ("ix_languages_code", "languages", ["code"]),
+    ("ix_keywords_lang_id", "keywords", ["lang_id"]),
+    ("ix_paragraphs_article_id_order", "paragraphs", ["article_id", "order"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY does not lock out writes, but cannot run inside a transaction.
+    # A failed concurrent build leaves an INVALID index behind; drop it before re-running.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
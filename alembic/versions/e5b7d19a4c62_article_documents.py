@@ -0,0 +1,29 @@
+"""article documents
+
+Revision ID: e5b7d19a4c62
+Revises: c3f9a2e4b815
+Create Date: 2024-12-23 10:12:45.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7d19a4c62'
+down_revision: Union[str, None] = 'c3f9a2e4b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # nullable without a default, so this is a catalog-only change; existing rows are
+    # filled by `pdm run cli backfill-documents` and served from their relations until then.
+    # IF NOT EXISTS: init_db runs create_all first, which already adds it on a new database
+    op.execute('ALTER TABLE articles ADD COLUMN IF NOT EXISTS document JSONB')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE articles DROP COLUMN IF EXISTS document')
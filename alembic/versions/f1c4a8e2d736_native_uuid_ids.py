@@ -0,0 +1,83 @@
+"""native uuid ids
+
+Revision ID: f1c4a8e2d736
+Revises: e5b7d19a4c62
+Create Date: 2024-12-27 11:05:39.672018
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c4a8e2d736'
+down_revision: Union[str, None] = 'e5b7d19a4c62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ID_COLUMNS = {
+    'languages': ['id'],
+    'openai_assistants': ['id'],
+    'articles': ['id', 'lang_id', 'assistant_id'],
+    'paragraphs': ['id', 'article_id'],
+    'keywords': ['id', 'lang_id', 'article_id'],
+    'article_keywords': ['article_id', 'keyword_id'],
+}
+
+
+def _bytea_columns(connection) -> dict:
+    rows = connection.execute(
+        sa.text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND data_type = 'bytea'"
+        )
+    )
+    found = {}
+    for table, column in rows:
+        if column in ID_COLUMNS.get(table, []):
+            found.setdefault(table, []).append(column)
+    return found
+
+
+def upgrade() -> None:
+    # UUIDType(binary=True) already creates native uuid columns on PostgreSQL, so on
+    # databases created by this app there is nothing to do. Only ids that ended up as
+    # bytea (16 raw bytes) are converted, in one transaction with their foreign keys.
+    connection = op.get_bind()
+    columns = _bytea_columns(connection)
+    if not columns:
+        return
+
+    inspector = sa.inspect(connection)
+    foreign_keys = [
+        (table, fk) for table in ID_COLUMNS for fk in inspector.get_foreign_keys(table)
+    ]
+
+    for table, fk in foreign_keys:
+        op.drop_constraint(fk['name'], table, type_='foreignkey')
+
+    for table, names in columns.items():
+        for column in names:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.Uuid(),
+                postgresql_using=f"encode({column}, 'hex')::uuid",
+            )
+
+    for table, fk in foreign_keys:
+        op.create_foreign_key(
+            fk['name'],
+            table,
+            fk['referred_table'],
+            fk['constrained_columns'],
+            fk['referred_columns'],
+        )
+
+
+def downgrade() -> None:
+    # native uuid is also what the previous models created; nothing to revert
+    pass
@@ -0,0 +1,141 @@
+"""
+Round trips and latency of ingesting one article, as POST /api/generate/article does it.
+
+Compares the single-transaction bulk path (db.ingest.ingest_article) with the previous
+row-by-row flow that committed after every row. Writes to the configured database and
+removes its own rows afterwards; point it at a scratch database.
+
+    pdm run bench-ingest --articles 50 --paragraphs 10 --keywords 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+from sqlalchemy import delete, event, select
+
+import models.requests as requests
+from db.database import init_languages
+from db.dependencies import AsyncSessionLocal, async_engine
+from db.ingest import ingest_article, new_short_id
+from db.languages import language_registry
+from db.models import Article, ArticleKeyword, Keyword, Paragraph
+
+
+class RoundTrips:
+    """Counts statements and commits sent over the async engine."""
+
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self._on_statement)
+        event.listen(async_engine.sync_engine, "commit", self._on_commit)
+
+    def _on_statement(self, *args):
+        self.statements += 1
+
+    def _on_commit(self, *args):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = self.commits = 0
+
+
+async def ingest_row_by_row(db, data: requests.ArticleData, lang_id):
+    """The flow create_article used before: a SELECT per keyword and a commit per row."""
+    article = Article(short_id=new_short_id(), lang_id=lang_id, title=data.title)
+    db.add(article)
+    await db.commit()
+
+    for keyword in data.keywords:
+        k = (await db.execute(select(Keyword.id).filter_by(keyword=keyword))).first()
+        if not k:
+            k = Keyword(keyword=keyword, lang_id=lang_id)
+            db.add(k)
+            await db.commit()
+
+        db.add(ArticleKeyword(keyword_id=k.id, article_id=article.id))
+        await db.commit()
+
+    for idx, paragraph in enumerate(data.paragraphs):
+        db.add(Paragraph(content=paragraph, order=idx, article_id=article.id))
+        await db.commit()
+
+
+async def ingest_bulk(db, data: requests.ArticleData, lang_id):
+    await ingest_article(db, data, lang_id)
+    await db.commit()
+
+
+def sample_article(run: str, idx: int, paragraphs: int, keywords: int) -> requests.ArticleData:
+    return requests.ArticleData(
+        lang="en",
+        title=f"Benchmark article {idx}",
+        intro="Benchmark perex",
+        paragraphs=[f"Paragraph {p} " + "lorem ipsum " * 80 for p in range(paragraphs)],
+        # half of the keywords are shared between articles, like real tags
+        keywords=[f"{run}-shared-{k}" for k in range(keywords // 2)]
+        + [f"{run}-{idx}-{k}" for k in range(keywords - keywords // 2)],
+        imagePrompt="Benchmark image",
+        social="Benchmark post",
+    )
+
+
+async def measure(name: str, ingest, args, counter: RoundTrips):
+    run = f"bench-{uuid.uuid4().hex[:6]}"
+    lang_id = language_registry.id_for("en")
+    latencies = []
+    counter.reset()
+
+    for idx in range(args.articles):
+        data = sample_article(run, idx, args.paragraphs, args.keywords)
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await ingest(db, data, lang_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    print(
+        f"{name:>12}: {counter.statements / args.articles:6.1f} statements, "
+        f"{counter.commits / args.articles:5.1f} commits per article, "
+        f"median {statistics.median(latencies):7.2f} ms, "
+        f"p95 {statistics.quantiles(latencies, n=20)[-1]:7.2f} ms"
+    )
+
+    await cleanup(run)
+
+
+async def cleanup(run: str):
+    async with AsyncSessionLocal() as db:
+        keyword_ids = select(Keyword.id).where(Keyword.keyword.startswith(run))
+        article_ids = select(ArticleKeyword.article_id).where(
+            ArticleKeyword.keyword_id.in_(keyword_ids)
+        )
+        article_ids = (await db.execute(article_ids)).scalars().all()
+
+        await db.execute(delete(ArticleKeyword).where(ArticleKeyword.article_id.in_(article_ids)))
+        await db.execute(delete(Paragraph).where(Paragraph.article_id.in_(article_ids)))
+        await db.execute(delete(Article).where(Article.id.in_(article_ids)))
+        await db.execute(delete(Keyword).where(Keyword.keyword.startswith(run)))
+        await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=10)
+    parser.add_argument("--keywords", type=int, default=8)
+    args = parser.parse_args()
+
+    await init_languages()
+    counter = RoundTrips()
+
+    await measure("row-by-row", ingest_row_by_row, args, counter)
+    await measure("bulk", ingest_bulk, args, counter)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
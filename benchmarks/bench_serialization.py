@@ -0,0 +1,97 @@
+"""
+Serialization cost of a large homepage page, without a database.
+
+Compares FastAPI's default path for an endpoint returning a typed model (re-validation
+against response_model, jsonable_encoder, json.dumps) with returning the model through
+payloads.FastJSONResponse and with the cached Payload the article routes build.
+
+    pdm run bench-serialization --articles 500 --paragraphs 8
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import models.responses as responses
+from payloads import FastJSONResponse, Payload
+
+
+def sample_page(articles: int, paragraphs: int) -> responses.ArticlePage:
+    return responses.ArticlePage(
+        articles=[
+            responses.Article(
+                publicId=f"{idx:08x}",
+                imageUrl=f"https://cdn.example.com/{idx:08x}.png",
+                lang="en",
+                seoSlug=f"benchmark-article-{idx}",
+                url=f"/en/{idx:08x}/benchmark-article-{idx}",
+                data=responses.ArticleData(
+                    title=f"Benchmark article {idx}",
+                    perex="",
+                    keywords=[f"keyword-{k}" for k in range(8)],
+                    paragraphs=[
+                        f"Paragraph {p} " + "lorem ipsum " * 60 for p in range(paragraphs)
+                    ],
+                ),
+            )
+            for idx in range(articles)
+        ],
+        nextCursor=None,
+    )
+
+
+def build_app(page: responses.ArticlePage) -> FastAPI:
+    app = FastAPI()
+    payload = Payload.of(page)
+
+    @app.get("/default", response_model=responses.ArticlePage)
+    async def default():
+        return page
+
+    @app.get("/fast", response_model=responses.ArticlePage)
+    async def fast():
+        return FastJSONResponse(page)
+
+    @app.get("/payload", response_model=responses.ArticlePage)
+    async def cached(request: Request):
+        return payload.response(request)
+
+    return app
+
+
+def measure(name: str, client: TestClient, path: str, repeat: int, expected: dict):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers={"Accept-Encoding": "identity"})
+        latencies.append((time.perf_counter() - started) * 1000)
+        assert response.json() == expected
+
+    print(
+        f"{name:>9}: median {statistics.median(latencies):7.2f} ms, "
+        f"p95 {statistics.quantiles(latencies, n=20)[-1]:7.2f} ms, "
+        f"{len(response.content) / 1024:7.1f} KiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=500)
+    parser.add_argument("--paragraphs", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    page = sample_page(args.articles, args.paragraphs)
+    expected = page.model_dump(mode="json")
+    client = TestClient(build_app(page))
+
+    measure("default", client, "/default", args.repeat, expected)
+    measure("fast", client, "/fast", args.repeat, expected)
+    measure("payload", client, "/payload", args.repeat, expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Latency of the join-heavy article reads, to compare id column types.
+
+Times a keyword-filtered homepage page (articles joined through article_keywords and
+keywords) followed by the selectin loads of its paragraphs and keywords, i.e. every id
+column bound as a parameter, compared in a join and decoded from the result. Run it once
+on each side of a change to `db/models.py` against the same data:
+
+    pdm run bench-uuid-joins > before.txt
+    pdm run bench-uuid-joins > after.txt
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from db.dependencies import AsyncSessionLocal, async_engine
+from db.models import Article, ArticleKeyword, Keyword
+
+
+async def busiest_keyword() -> Keyword:
+    async with AsyncSessionLocal() as db:
+        query = (
+            select(Keyword)
+            .join(ArticleKeyword, ArticleKeyword.keyword_id == Keyword.id)
+            .group_by(Keyword.id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+        return (await db.execute(query)).scalars().one()
+
+
+async def read_page(keyword: Keyword, limit: int) -> int:
+    async with AsyncSessionLocal() as db:
+        query = (
+            select(Article)
+            .options(selectinload(Article.paragraphs), selectinload(Article.keywords))
+            .join(ArticleKeyword, ArticleKeyword.article_id == Article.id)
+            .join(Keyword, Keyword.id == ArticleKeyword.keyword_id)
+            .where(Keyword.keyword == keyword.keyword, Article.lang_id == keyword.lang_id)
+            .order_by(Article.published.desc(), Article.id.desc())
+            .limit(limit)
+        )
+        articles = (await db.execute(query)).scalars().all()
+        return sum(len(article.paragraphs) + len(article.keywords) for article in articles)
+
+
+async def read_all(limit: int) -> int:
+    async with AsyncSessionLocal() as db:
+        query = (
+            select(Article)
+            .options(selectinload(Article.paragraphs), selectinload(Article.keywords))
+            .order_by(Article.published.desc(), Article.id.desc())
+            .limit(limit)
+        )
+        articles = (await db.execute(query)).scalars().all()
+        return sum(len(article.paragraphs) + len(article.keywords) for article in articles)
+
+
+async def measure(name: str, read, repeat: int):
+    await read()  # warm up the pool and the statement cache
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await read()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    print(
+        f"{name:>16}: {rows:6d} child rows, median {statistics.median(latencies):7.2f} ms, "
+        f"p95 {statistics.quantiles(latencies, n=20)[-1]:7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    keyword = await busiest_keyword()
+    await measure("keyword page", lambda: read_page(keyword, args.limit), args.repeat)
+    await measure("latest articles", lambda: read_all(args.limit * 5), args.repeat)
+
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
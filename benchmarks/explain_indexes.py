@@ -0,0 +1,125 @@
+"""
+EXPLAIN-based check of the read path queries.
+
+Runs EXPLAIN (ANALYZE, BUFFERS) for every query the article endpoints issue and prints the
+access method, execution time and shared buffers touched. Run it once before and once after
+`alembic upgrade head` against the same data to compare:
+
+    pdm run bench-indexes > before.txt
+    alembic upgrade head
+    pdm run bench-indexes > after.txt
+"""
+
+import argparse
+import json
+import re
+import statistics
+
+from sqlalchemy import text
+
+from db.database import engine
+
+SAMPLE_QUERIES = {
+    "language by code": (
+        "SELECT id FROM languages WHERE code = :code",
+        lambda sample: {"code": sample["code"]},
+    ),
+    "homepage page": (
+        "SELECT * FROM articles WHERE lang_id = :lang_id AND published IS NOT NULL "
+        "ORDER BY published DESC, id DESC LIMIT 21",
+        lambda sample: {"lang_id": sample["lang_id"]},
+    ),
+    "article by short_id and language": (
+        "SELECT * FROM articles WHERE short_id = :short_id AND lang_id = :lang_id",
+        lambda sample: {"short_id": sample["short_id"], "lang_id": sample["lang_id"]},
+    ),
+    "paragraphs of an article": (
+        'SELECT * FROM paragraphs WHERE article_id = :article_id ORDER BY "order"',
+        lambda sample: {"article_id": sample["article_id"]},
+    ),
+    "keywords of an article": (
+        "SELECT keywords.* FROM keywords JOIN article_keywords "
+        "ON keywords.id = article_keywords.keyword_id "
+        "WHERE article_keywords.article_id = :article_id",
+        lambda sample: {"article_id": sample["article_id"]},
+    ),
+    "articles by keyword": (
+        "SELECT articles.* FROM articles JOIN article_keywords "
+        "ON article_keywords.article_id = articles.id "
+        "WHERE article_keywords.keyword_id = :keyword_id AND articles.lang_id = :lang_id",
+        lambda sample: {"keyword_id": sample["keyword_id"], "lang_id": sample["lang_id"]},
+    ),
+    "keywords by language": (
+        "SELECT * FROM keywords WHERE lang_id = :lang_id",
+        lambda sample: {"lang_id": sample["lang_id"]},
+    ),
+}
+
+
+def load_sample(connection) -> dict:
+    row = connection.execute(
+        text(
+            "SELECT articles.id AS article_id, articles.short_id, articles.lang_id, "
+            "languages.code, article_keywords.keyword_id "
+            "FROM articles JOIN languages ON languages.id = articles.lang_id "
+            "LEFT JOIN article_keywords ON article_keywords.article_id = articles.id "
+            "ORDER BY articles.published DESC NULLS LAST LIMIT 1"
+        )
+    ).first()
+
+    if row is None:
+        raise SystemExit("No articles to benchmark against; generate some content first.")
+
+    return dict(row._mapping)
+
+
+def scan_nodes(plan: dict) -> list:
+    """Flatten the plan tree into 'Node Type on relation (index)' strings."""
+    label = plan["Node Type"]
+    if "Relation Name" in plan:
+        label += f" on {plan['Relation Name']}"
+    if "Index Name" in plan:
+        label += f" using {plan['Index Name']}"
+
+    nodes = [label] if re.search("Scan", plan["Node Type"]) else []
+    for child in plan.get("Plans", []):
+        nodes.extend(scan_nodes(child))
+    return nodes
+
+
+def explain(connection, sql: str, params: dict, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        result = connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params)
+        document = result.scalar()
+        report = document[0] if isinstance(document, list) else json.loads(document)[0]
+        timings.append(report["Execution Time"])
+
+    plan = report["Plan"]
+    return {
+        "scans": scan_nodes(plan),
+        "median_ms": statistics.median(timings),
+        "shared_buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per query (median is shown)")
+    args = parser.parse_args()
+
+    with engine.connect() as connection:
+        sample = load_sample(connection)
+
+        for name, (sql, bind) in SAMPLE_QUERIES.items():
+            if sample.get("keyword_id") is None and ":keyword_id" in sql:
+                continue
+
+            report = explain(connection, sql, bind(sample), args.repeat)
+            print(f"{name}: {report['median_ms']:.3f} ms, {report['shared_buffers']} buffers")
+            for scan in report["scans"]:
+                print(f"    {scan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from openai import AsyncOpenAI
+from openai.types.beta import Assistant
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import OpenAIAssistant
+
+ASSISTANT_SYNC_INTERVAL = float(os.getenv("AI_ART_ASSISTANT_SYNC_INTERVAL", "300"))
+
+assistants_statement = select(OpenAIAssistant.assistant_id, OpenAIAssistant.id).order_by(
+    OpenAIAssistant.datetime_created, OpenAIAssistant.id
+)
+
+
+class AssistantRegistry:
+    """
+    Process-wide view of our assistants, in the openai_assistants table and in the cloud.
+
+    Maps cloud ids to primary keys and knows the most recent assistant, so a generation
+    attempt resolves its assistant without a query; the table is read when first needed and
+    again on `refresh`. The cloud listing is kept too, re-synced every `interval` seconds by
+    `run`. `invalidate` drops both, so the next lookup reads them afresh.
+    """
+
+    def __init__(self, interval: float = ASSISTANT_SYNC_INTERVAL):
+        self.interval = interval
+        self._pks: Dict[str, uuid.UUID] = {}
+        self._current: Optional[str] = None
+        self._loaded = False
+        self._cloud: Optional[List[Assistant]] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pks)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    async def refresh(self, db: AsyncSession):
+        pks: Dict[str, uuid.UUID] = {}
+        current = None
+        for assistant_id, pk in (await db.execute(assistants_statement)).all():
+            pks[assistant_id] = pk
+            current = assistant_id
+
+        self._pks, self._current, self._loaded = pks, current, True
+        logger.debug(f"Loaded {len(pks)} assistants")
+
+    def remember(self, assistant: OpenAIAssistant):
+        """Register a newly stored assistant; it becomes the current one."""
+        self._pks[assistant.assistant_id] = assistant.id
+        self._current = assistant.assistant_id
+        if self._cloud is not None and not self.in_cloud(assistant.assistant_id):
+            # the next sync fills in the cloud object
+            self._cloud = None
+
+    def current(self) -> Optional[str]:
+        """Cloud id of the most recently stored assistant."""
+        return self._current
+
+    async def ensure_current(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        create: Callable[[], Awaitable[OpenAIAssistant]],
+    ) -> str:
+        """
+        The current assistant, reading the table when none is known; `create` is awaited when
+        the table has none either. The concurrent generations of one topic all get here at
+        once, so the check and the creation are done by one caller at a time.
+        """
+        if self._current is None:
+            async with self._lock:
+                if self._current is None:
+                    async with session_factory() as db:
+                        await self.refresh(db)
+                if self._current is None:
+                    self.remember(await create())
+        return self._current
+
+    def pk_for(self, assistant_id: str) -> Optional[uuid.UUID]:
+        return self._pks.get(assistant_id)
+
+    async def sync_cloud(self, client: AsyncOpenAI, force: bool = False):
+        """List the cloud assistants, unless they are cached already and `force` is not set."""
+        async with self._lock:
+            # callers that found the cache empty together wait for the first one's listing
+            if self._cloud is not None and not force:
+                return
+            self._cloud = [assistant async for assistant in client.beta.assistants.list()]
+        logger.debug(f"Synced {len(self._cloud)} assistants from the cloud")
+
+    def cloud(self) -> Optional[List[Assistant]]:
+        """The cloud listing as last synced, or None before the first sync."""
+        return self._cloud
+
+    def in_cloud(self, assistant_id: str) -> bool:
+        return any(assistant.id == assistant_id for assistant in self._cloud or [])
+
+    def invalidate(self):
+        self._pks, self._current, self._loaded = {}, None, False
+        self._cloud = None
+
+    async def run(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        client_factory: Callable[[], AsyncOpenAI],
+    ):
+        """Re-read the table and re-sync the cloud listing periodically until cancelled."""
+        while True:
+            try:
+                async with session_factory() as db:
+                    await self.refresh(db)
+                await self.sync_cloud(client_factory(), force=True)
+            except Exception as e:
+                logger.error(f"Error syncing assistants: {e}")
+            await asyncio.sleep(self.interval)
+
+
+assistant_registry = AssistantRegistry()
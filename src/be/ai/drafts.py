@@ -0,0 +1,225 @@
+import json
+import uuid
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models.requests as requests
+from db.dependencies import AsyncSessionLocal
+from db.ingest import add_draft_paragraphs, discard_draft, finish_draft, start_draft
+from db.languages import language_registry
+from db.models import Article
+
+# the fields an article row needs before its paragraphs can be attached to it
+HEADER_FIELDS = ("language", "title", "perex")
+
+
+class StreamedPart(NamedTuple):
+    # "field" for a completed top-level field, "paragraph" for one element of `paragraphs`
+    kind: str
+    key: str
+    value: Any
+
+
+class ArticleStreamParser:
+    """
+    Incremental parser for the article JSON the assistant writes.
+
+    `feed` takes the output as it streams, in chunks split anywhere, and returns what became
+    complete: each top-level field once its value is closed, and each element of
+    `paragraphs` on its own as soon as its string is closed (the whole list is reported as a
+    field too, at its end). Anything before the opening brace, like a ```json fence, is
+    skipped. Values are decoded with json.loads, one at a time.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        # at depth 1: "key", "colon", "value", "scalar", "nested" or "next"
+        self._expecting = "key"
+        self._key: Optional[str] = None
+        self._value_start = 0
+
+    def feed(self, chunk: str) -> List[StreamedPart]:
+        self._text += chunk
+        parts: List[StreamedPart] = []
+
+        text = self._text
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+                    self._string_closed(i, parts)
+                continue
+
+            if self._depth == 0:
+                if c == "{" and self._key is None:
+                    self._depth = 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._expecting == "value":
+                    self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and self._expecting == "value":
+                    self._value_start = i
+                    self._expecting = "nested"
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1 and self._expecting == "scalar":
+                    self._field(text[self._value_start : i], parts)
+                self._depth -= 1
+                if self._depth == 1 and self._expecting == "nested":
+                    self._field(text[self._value_start : i + 1], parts)
+            elif self._depth == 1:
+                if c == ":" and self._expecting == "colon":
+                    self._expecting = "value"
+                elif c == ",":
+                    if self._expecting == "scalar":
+                        self._field(text[self._value_start : i], parts)
+                    self._expecting = "key"
+                elif not c.isspace() and self._expecting == "value":
+                    self._value_start = i
+                    self._expecting = "scalar"
+
+        self._pos = len(text)
+        return parts
+
+    def _string_closed(self, end: int, parts: List[StreamedPart]):
+        raw = self._text[self._string_start : end + 1]
+        if self._depth == 1 and self._expecting == "key":
+            self._key = json.loads(raw)
+            self._expecting = "colon"
+        elif self._depth == 1 and self._expecting == "value":
+            self._field(raw, parts)
+        elif self._depth == 2 and self._expecting == "nested" and self._key == "paragraphs":
+            parts.append(StreamedPart("paragraph", self._key, json.loads(raw)))
+
+    def _field(self, raw: str, parts: List[StreamedPart]):
+        parts.append(StreamedPart("field", self._key, json.loads(raw)))
+        self._expecting = "next"
+
+
+def language_code(code: str) -> str:
+    """The assistant sometimes answers "cz" for Czech."""
+    return "cs" if code == "cz" else code
+
+
+class ArticleDraft:
+    """
+    One language variant of a generated article, persisted while the assistant writes it.
+
+    Fed the streamed output of a run, it inserts the article (status "generating") as soon
+    as its language, title and perex are known and then commits every paragraph as it is
+    closed, so `/api/articles/{public_id}` shows the article growing. `finish` completes it
+    from the final message; `discard` removes what a run that did not complete left behind.
+    A failing draft write only logs: the final message is saved either way.
+    """
+
+    def __init__(
+        self,
+        short_id: str,
+        thread_id: str,
+        assistant_id: Optional[uuid.UUID] = None,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.short_id = short_id
+        self.thread_id = thread_id
+        self.assistant_id = assistant_id
+        self._session_factory = session_factory
+        self.message_id: Optional[str] = None
+        self.article: Optional[Article] = None
+        self._parser = ArticleStreamParser()
+        self._fields: Dict[str, Any] = {}
+        self._pending: List[str] = []
+        self._broken = False
+        self._finished = False
+
+    async def feed(self, message_id: str, text: str):
+        # a run writes one answer; deltas of any other message are not ours
+        if self.message_id is None:
+            self.message_id = message_id
+        if message_id != self.message_id or self._broken:
+            return
+
+        try:
+            for part in self._parser.feed(text):
+                if part.kind == "paragraph":
+                    self._pending.append(part.value)
+                else:
+                    self._fields[part.key] = part.value
+            await self._persist()
+        except Exception as e:
+            self._broken = True
+            logger.error(f"Error persisting draft of {self.short_id}: {e}")
+
+    async def _persist(self):
+        if self.article is None:
+            if not all(field in self._fields for field in HEADER_FIELDS):
+                return
+
+            lang_id = language_registry.id_for(language_code(self._fields["language"]))
+            if lang_id is None:
+                raise Exception(f"Unknown language: {self._fields['language']}")
+
+            async with self._session_factory() as db:
+                self.article = await start_draft(
+                    db,
+                    lang_id,
+                    self.short_id,
+                    self._fields["title"],
+                    self._fields["perex"],
+                    assistant_id=self.assistant_id,
+                    thread_id=self.thread_id,
+                )
+                await add_draft_paragraphs(db, self.article, self._pending)
+                await db.commit()
+            self._pending = []
+            logger.debug(f"draft {self.short_id} in {self._fields['language']} started")
+
+        elif self._pending:
+            async with self._session_factory() as db:
+                await add_draft_paragraphs(db, self.article, self._pending)
+                await db.commit()
+            self._pending = []
+
+    async def finish(self, data: requests.ArticleData) -> Optional[Article]:
+        """
+        Complete the draft with the final message. Returns None, leaving nothing behind, when
+        no usable draft was written; the caller then saves the message as a new article.
+        """
+        if self._broken:
+            await self.discard()
+        if self.article is None:
+            return None
+
+        async with self._session_factory() as db:
+            await finish_draft(db, self.article, data)
+            await db.commit()
+        self._finished = True
+        return self.article
+
+    async def discard(self):
+        if self.article is None or self._finished:
+            return
+
+        try:
+            async with self._session_factory() as db:
+                await discard_draft(db, self.article)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error discarding draft of {self.short_id}: {e}")
+        self.article = None
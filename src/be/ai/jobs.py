@@ -0,0 +1,214 @@
+import asyncio
+import datetime
+import os
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.openai_assistant import GENERATION_LANGUAGES, Progress, command
+from db.ingest import discard_drafts, new_short_id
+from db.models import GenerationJob
+
+JOB_WORKERS = int(os.getenv("AI_ART_JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("AI_ART_JOB_POLL_INTERVAL", "5"))
+JOB_STALE_AFTER = float(os.getenv("AI_ART_JOB_STALE_AFTER", "600"))
+
+# topic, short id, progress callback, languages still to generate
+Runner = Callable[[str, str, Progress, List[str]], Awaitable[object]]
+
+
+class JobQueue:
+    """
+    Article generation jobs, queued in the generation_jobs table.
+
+    POST /api/oai/command only inserts a row; up to `workers` jobs per process run at a
+    time as coroutines on the event loop, next to the requests being served. Jobs are
+    claimed with FOR UPDATE SKIP LOCKED, so every uvicorn worker drains the same queue
+    and a job submitted to one worker may run on another. Idle workers poll every
+    `poll_interval` seconds; a submit wakes the local ones at once. A job cancelled at
+    shutdown is put back in the queue. A running job's `updated` is touched regularly; one
+    untouched for `stale_after` seconds belonged to a process that died and is claimed
+    again. Either way only the languages that are not done yet are generated again, after
+    the drafts the interrupted run left behind are removed.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        poll_interval: float = JOB_POLL_INTERVAL,
+        runner: Runner = command,
+        stale_after: float = JOB_STALE_AFTER,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._runner = runner
+        self._wakeup = asyncio.Event()
+
+    async def submit(self, db: AsyncSession, topic: str) -> GenerationJob:
+        job = GenerationJob(
+            id=uuid.uuid4(),
+            topic=topic,
+            status="queued",
+            short_id=new_short_id(),
+            languages={lang: "queued" for lang in GENERATION_LANGUAGES},
+        )
+        db.add(job)
+        await db.commit()
+
+        self._wakeup.set()
+        return job
+
+    async def _claim(
+        self, session_factory: Callable[[], AsyncSession]
+    ) -> Optional[GenerationJob]:
+        stale = datetime.datetime.now() - datetime.timedelta(seconds=self.stale_after)
+        oldest = (
+            select(GenerationJob.id)
+            .where(
+                or_(
+                    GenerationJob.status == "queued",
+                    and_(GenerationJob.status == "running", GenerationJob.updated < stale),
+                )
+            )
+            .order_by(GenerationJob.created)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        claim = (
+            update(GenerationJob)
+            .where(GenerationJob.id == oldest)
+            .values(status="running", updated=datetime.datetime.now())
+            .returning(GenerationJob)
+        )
+
+        async with session_factory() as db:
+            job = (await db.execute(claim)).scalars().first()
+            await db.commit()
+            return job
+
+    def _progress(
+        self, session_factory: Callable[[], AsyncSession], job: GenerationJob
+    ) -> Progress:
+        """A callback for the generation coroutines that records per-language status."""
+        languages: Dict[str, str] = dict(job.languages or {})
+        lock = asyncio.Lock()
+
+        async def on_progress(lang: str, status: str):
+            # the languages report concurrently; the lock keeps their writes in order
+            async with lock:
+                languages[lang] = status
+                try:
+                    async with session_factory() as db:
+                        await db.execute(
+                            update(GenerationJob)
+                            .where(GenerationJob.id == job.id)
+                            .values(languages=dict(languages), updated=datetime.datetime.now())
+                        )
+                        await db.commit()
+                except Exception as e:
+                    # never let bookkeeping fail the generation itself
+                    logger.error(f"Error recording progress of job {job.id}: {e}")
+
+        return on_progress
+
+    async def _heartbeat(self, session_factory: Callable[[], AsyncSession], job: GenerationJob):
+        """Touch `updated` while the job runs, so it is not taken for a dead worker's."""
+        while True:
+            await asyncio.sleep(self.stale_after / 4)
+            try:
+                async with session_factory() as db:
+                    await db.execute(
+                        update(GenerationJob)
+                        .where(GenerationJob.id == job.id)
+                        .values(updated=datetime.datetime.now())
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.error(f"Error touching job {job.id}: {e}")
+
+    async def _requeue(self, session_factory: Callable[[], AsyncSession], job: GenerationJob):
+        async with session_factory() as db:
+            requeued = await db.get(GenerationJob, job.id, populate_existing=True)
+            requeued.languages = {
+                lang: status if status == "done" else "queued"
+                for lang, status in (requeued.languages or {}).items()
+            }
+            requeued.status = "queued"
+            requeued.updated = datetime.datetime.now()
+            await db.commit()
+
+        logger.info(f"Job {job.id}: interrupted, queued again")
+
+    async def _execute(self, session_factory: Callable[[], AsyncSession], job: GenerationJob):
+        logger.info(f"Job {job.id}: generating '{job.topic}' as {job.short_id}")
+        values = {"status": "done"}
+        languages = job.languages or {lang: "queued" for lang in GENERATION_LANGUAGES}
+        pending = [lang for lang, status in languages.items() if status != "done"]
+
+        heartbeat = asyncio.create_task(self._heartbeat(session_factory, job))
+        try:
+            async with session_factory() as db:
+                if await discard_drafts(db, job.short_id):
+                    logger.info(f"Job {job.id}: removed drafts of an interrupted run")
+                await db.commit()
+
+            progress = self._progress(session_factory, job)
+            await self._runner(job.topic, job.short_id, progress, pending)
+        except asyncio.CancelledError:
+            # shutting down: leave the job to the next worker, even if cancelled again
+            await asyncio.shield(self._requeue(session_factory, job))
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            values = {"status": "failed", "error": str(e)}
+        finally:
+            heartbeat.cancel()
+
+        async with session_factory() as db:
+            finished = await db.get(GenerationJob, job.id, populate_existing=True)
+            if values["status"] == "done" and "failed" in (finished.languages or {}).values():
+                values = {"status": "failed", "error": "generation failed in some languages"}
+            for key, value in values.items():
+                setattr(finished, key, value)
+            finished.updated = datetime.datetime.now()
+            await db.commit()
+
+        logger.info(f"Job {job.id}: {values['status']}")
+
+    async def _work(self, session_factory: Callable[[], AsyncSession]):
+        while True:
+            # a cancel landing in a database call can come back as an ordinary error
+            # (the connection is closed under the cancelled statement); stop anyway
+            if asyncio.current_task().cancelling():
+                raise asyncio.CancelledError()
+
+            try:
+                job = await self._claim(session_factory)
+            except Exception as e:
+                logger.error(f"Error claiming a generation job: {e}")
+                job = None
+
+            if job is not None:
+                try:
+                    await self._execute(session_factory, job)
+                except Exception as e:
+                    logger.error(f"Error finishing generation job {job.id}: {e}")
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def run(self, session_factory: Callable[[], AsyncSession]):
+        """Run `workers` job loops until cancelled."""
+        await asyncio.gather(*(self._work(session_factory) for _ in range(self.workers)))
+
+
+job_queue = JobQueue()
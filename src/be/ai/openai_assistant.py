@@ -1,17 +1,25 @@
-import threading
-import time
+import asyncio
 import os
 import uuid
-
-from db.database import Session
-from db.models import Article, Keyword, Language, OpenAIAssistant, Paragraph
-from db.dependencies import SessionLocal
+from typing import Awaitable, Callable, List, Optional
+
+from ai.assistants import assistant_registry
+from ai.drafts import ArticleDraft, language_code
+from cache import response_cache
+from db.dependencies import AsyncSessionLocal
+from db.ingest import ingest_article
+from db.languages import language_registry
+from db.related import related_index
+from db.models import Article, OpenAIAssistant
 from dotenv import load_dotenv
-from openai import Client, OpenAI
+import httpx
+from openai import APIConnectionError, AsyncOpenAI, DefaultAsyncHttpxClient
 from openai.types.beta import Assistant
-from openai.types.beta.threads import Message
+from openai.types.beta.threads import Message, Run
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
-import requests
+import models.requests as requests
 import boto3
 from botocore.client import Config
 from botocore.exceptions import NoCredentialsError
@@ -30,6 +38,28 @@ OPENAI_ORGANIZATION_ID = os.environ.get("AI_ART_OPENAI_ORGANIZATION_ID", default
 OPENAI_PROJECT_ID = os.environ.get("AI_ART_OPENAI_PROJECT_ID", default="")
 OPENAI_GPT_MODEL = os.environ.get("AI_ART_OPENAI_GPT_MODEL", default="gpt-4o")
 
+# one connection per concurrent run poll or message call is plenty; idle ones are kept
+# open for reuse between polls
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("AI_ART_OPENAI_MAX_CONNECTIONS", default="50"))
+OPENAI_MAX_KEEPALIVE = int(os.environ.get("AI_ART_OPENAI_MAX_KEEPALIVE", default="20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get("AI_ART_OPENAI_KEEPALIVE_EXPIRY", default="30"))
+
+GENERATION_LANGUAGES = ["czech", "english", "german"]
+
+# polling only takes over when a run's event stream breaks off; it starts short and backs
+# off unless the server says when to look again (openai-poll-after-ms)
+RUN_POLL_INITIAL = float(os.environ.get("AI_ART_OPENAI_RUN_POLL_INITIAL", default="0.25"))
+RUN_POLL_MAX = float(os.environ.get("AI_ART_OPENAI_RUN_POLL_MAX", default="5"))
+
+RUN_FINAL_STATUSES = {
+    "completed",
+    "failed",
+    "cancelled",
+    "expired",
+    "incomplete",
+    "requires_action",
+}
+
 AI_S3_SECRET_KEY = os.environ.get("AI_ART_S3_SECRET_ACCESS_KEY", default="")
 AI_S3_ACCESS_KEY = os.environ.get("AI_ART_S3_ACCESS_KEY_ID", default="")
 AI_S3_ENDPOINT = os.environ.get("AI_ART_S3_ENDPOINT")
@@ -42,35 +72,64 @@ AI_S3_IMAGE_FOLDER = os.environ.get("AI_ART_S3_IMAGE_FOLDER")
 # logger.debug(f"{OPENAI_ASSISTANT_ID=}")
 # logger.debug(f"{OPENAI_ORGANIZATION_ID=}")
 # logger.debug(f"{AI_S3_ENDPOINT=}")
-client = OpenAI(
-    # api_key=os.environ.get("AI_ART_OPENAI_API_KEY", default=""),
-    organization=OPENAI_ORGANIZATION_ID,
-    project=OPENAI_PROJECT_ID,
-)
-# TODO: delete assistants that are not in openai cloud
 
+Progress = Callable[[str, str], Awaitable[None]]
+
+_client: Optional[AsyncOpenAI] = None
 
-def list_assistants(client: Client | None = None):
-    if client is None:
-        client = OpenAI(organization=OPENAI_ORGANIZATION_ID, project=OPENAI_PROJECT_ID)
 
-    return client.beta.assistants.list()
+def get_client() -> AsyncOpenAI:
+    """
+    The process-wide OpenAI client, built on first use.
+
+    Sharing it keeps one httpx connection pool, so the polls of concurrent generations
+    reuse warm TLS connections instead of opening new ones per call.
+    """
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            organization=OPENAI_ORGANIZATION_ID,
+            project=OPENAI_PROJECT_ID,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                )
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+# TODO: delete assistants that are not in openai cloud
+
 
+async def list_assistants() -> List[Assistant]:
+    """Our assistants in the cloud, as last synced by `assistant_registry`."""
+    if assistant_registry.cloud() is None:
+        await assistant_registry.sync_cloud(get_client())
+    return assistant_registry.cloud()
 
-def is_assistant_in_cloud(assistant_id: str) -> bool:
-    assistants = list_assistants()
-    return any(assistant.id == assistant_id for assistant in assistants)
 
+async def is_assistant_in_cloud(assistant_id: str) -> bool:
+    if assistant_registry.cloud() is None:
+        await assistant_registry.sync_cloud(get_client())
+    return assistant_registry.in_cloud(assistant_id)
 
-def create_assistant() -> OpenAIAssistant:
-    response = _create_assistant()
-    return store_assistant(response)
 
+async def create_assistant() -> OpenAIAssistant:
+    response = await _create_assistant()
+    return await store_assistant(response)
 
-def _create_assistant(client: Client | None = None) -> Assistant:
-    if client is None:
-        client = OpenAI(organization=OPENAI_ORGANIZATION_ID, project=OPENAI_PROJECT_ID)
 
+async def _create_assistant() -> Assistant:
     instructions = """        
         You are a articles writer on various topics. 
         You are writing in multiple languages (for example "en" as english, "es" as spanish, etc...)
@@ -94,7 +153,7 @@ def _create_assistant(client: Client | None = None) -> Assistant:
         }
     
     """
-    return client.beta.assistants.create(
+    return await get_client().beta.assistants.create(
         description="Assistant for the OpenAI-powered FastAPI app",
         name="OpenAI Assistant",
         model=OPENAI_GPT_MODEL,
@@ -102,240 +161,350 @@ def _create_assistant(client: Client | None = None) -> Assistant:
     )
 
 
-def store_assistant(assistant: Assistant) -> OpenAIAssistant:
-    session = SessionLocal()
-    new_assistant = OpenAIAssistant(
-        assistant_id=assistant.id,
-        instructions=assistant.instructions,
-        model=assistant.model,
-        description=assistant.description,
-        name=assistant.name,
-    )
-    session.add(new_assistant)
-    session.commit()
-    return new_assistant
+async def store_assistant(assistant: Assistant) -> OpenAIAssistant:
+    async with AsyncSessionLocal() as session:
+        new_assistant = OpenAIAssistant(
+            assistant_id=assistant.id,
+            instructions=assistant.instructions,
+            model=assistant.model,
+            description=assistant.description,
+            name=assistant.name,
+        )
+        session.add(new_assistant)
+        await session.commit()
+        assistant_registry.remember(new_assistant)
+        return new_assistant
 
 
-def get_most_recent_assistant(session: Session) -> OpenAIAssistant | None:
-    return session.query(OpenAIAssistant).order_by(OpenAIAssistant.datetime_created.desc()).first()
+async def get_most_recent_assistant(session: AsyncSession) -> OpenAIAssistant | None:
+    query = select(OpenAIAssistant).order_by(OpenAIAssistant.datetime_created.desc()).limit(1)
+    return (await session.execute(query)).scalars().first()
 
 
-def retrieve_assistant() -> str:
-    session = SessionLocal()
-    try:
-        if session.query(OpenAIAssistant).count() == 0:
-            return create_assistant().assistant_id
-        assistant = get_most_recent_assistant(session)
-        return assistant.assistant_id
-    finally:
-        session.close()
+async def retrieve_assistant() -> str:
+    """Cloud id of the most recent assistant, creating one if there is none."""
+    return await assistant_registry.ensure_current(AsyncSessionLocal, create_assistant)
 
 
-def handle_assistant():
-    client = OpenAI(organization=OPENAI_ORGANIZATION_ID, project=OPENAI_PROJECT_ID)
+async def handle_assistant():
+    assistants = await list_assistants()
+    if not assistants:
+        await create_assistant()
 
-    assistants = list_assistants(client=client)
-    if len(assistants) == 0:
-        create_assistant(client=client)
 
+async def follow_run(
+    client: AsyncOpenAI,
+    thread_id: str,
+    assistant_id: str,
+    on_text: Callable[[str, str], Awaitable[None]] | None = None,
+) -> Run:
+    """
+    Start a run and wait until it stops, returning the run in its final status.
 
-def command(topic: str):
-    client = OpenAI(organization=OPENAI_ORGANIZATION_ID, project=OPENAI_PROJECT_ID)
-    short_id = uuid.uuid4().hex[:8]
-    message = f"Write a detailed, informative article about {topic}"
-
-    threads = []
-
-    # Create a single session to be used across all threads
-    session = SessionLocal()
+    The run is created streaming, so its completion arrives as an event rather than on the
+    next poll. `on_text(message_id, text)` is awaited with every piece of message text as it
+    is written. If the stream ends or breaks before that, the run is polled instead.
+    """
+    run = None
     try:
-        for lang in ["czech", "english", "german"]:
-            thread = threading.Thread(
-                target=_generate, args=(message, client, short_id, lang, session)
-            )
-            threads.append(thread)
+        stream = await client.beta.threads.runs.create(
+            thread_id=thread_id, assistant_id=assistant_id, stream=True
+        )
+        async with stream:
+            async for event in stream:
+                if event.event == "thread.message.delta" and on_text is not None:
+                    for block in event.data.delta.content or []:
+                        if block.type == "text" and block.text and block.text.value:
+                            await on_text(event.data.id, block.text.value)
+                elif event.event.startswith("thread.run.") and isinstance(event.data, Run):
+                    run = event.data
+                    if run.status in RUN_FINAL_STATUSES:
+                        return run
+    except (APIConnectionError, httpx.HTTPError) as e:
+        if run is None:
+            raise
+        logger.warning(f"Event stream of run {run.id} broke off: {e}")
+
+    if run is None:
+        raise Exception("Run stream ended before the run was created")
+
+    return await poll_run(client, thread_id, run.id)
+
+
+async def poll_run(
+    client: AsyncOpenAI,
+    thread_id: str,
+    run_id: str,
+    initial: float = RUN_POLL_INITIAL,
+    maximum: float = RUN_POLL_MAX,
+) -> Run:
+    """Poll a run until it stops, backing off from `initial` to `maximum` seconds."""
+    delay = initial
+    while True:
+        response = await client.beta.threads.runs.with_raw_response.retrieve(
+            thread_id=thread_id, run_id=run_id
+        )
+        run = response.parse()
+        if run.status in RUN_FINAL_STATUSES:
+            return run
+
+        hint = response.headers.get("openai-poll-after-ms")
+        if hint and hint.isdigit():
+            await asyncio.sleep(int(hint) / 1000)
+        else:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, maximum)
+
+
+async def command(
+    topic: str,
+    short_id: str | None = None,
+    on_progress: Progress | None = None,
+    languages: List[str] | None = None,
+):
+    """
+    Generate the article in `languages` (all GENERATION_LANGUAGES by default) concurrently.
 
-        for thread in threads:
-            thread.start()
+    Each language is a coroutine on the shared client, so concurrent topics cost no
+    threads. `on_progress(lang, status)` is awaited as a language becomes running, done
+    or failed. Raises the first language's error after all of them finished.
+    """
+    short_id = short_id or uuid.uuid4().hex[:8]
+    message = f"Write a detailed, informative article about {topic}"
 
-        for thread in threads:
-            thread.join()
+    results = await asyncio.gather(
+        *(
+            _generate(message, short_id, lang, on_progress=on_progress)
+            for lang in languages or GENERATION_LANGUAGES
+        ),
+        return_exceptions=True,
+    )
 
-        # Check if any threads raised exceptions
-        for thread in threads:
-            if hasattr(thread, "_exception"):
-                logger.error(f"Thread failed with exception: {thread._exception}")
-                raise thread._exception
+    for result in results:
+        if isinstance(result, BaseException):
+            logger.error(f"Generation failed with exception: {result}")
+            raise result
 
-        return short_id
-    finally:
-        session.close()
+    return short_id
 
 
-def _generate(
+async def _generate(
     message,
-    client,
     short_id,
     lang: str,
-    session: Session,
     max_retries: int = 3,
     retry_delay: int = 30,
+    on_progress: Progress | None = None,
 ):
     logger.info(f"generating in {lang}")
+    client = get_client()
+
+    async def report(status: str):
+        if on_progress is not None:
+            await on_progress(lang, status)
+
+    await report("running")
 
     for attempt in range(max_retries):
+        draft = None
         try:
-            thread = client.beta.threads.create()
+            thread = await client.beta.threads.create()
             thread_id = thread.id
 
             # Get assistant_id within the retry loop
-            assistant_id = retrieve_assistant()
+            assistant_id = await retrieve_assistant()
             if not assistant_id:
                 raise Exception("Failed to retrieve assistant ID")
 
             logger.info(f"Using assistant: {assistant_id}")
 
-            client.beta.threads.messages.create(
+            await client.beta.threads.messages.create(
                 thread_id=thread_id,
                 role="user",
                 content=f"{message} in language: {lang}",
             )
 
-            run = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id)
-
-            while True:
-                try:
-                    run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
-                except Exception as e:
-                    logger.error(f"Error retrieving run: {e}")
-                    break
-
-                if run.status == "completed":
-                    messages = client.beta.threads.messages.list(thread_id=thread_id)
-                    for msg in messages:
-                        save_to_database(short_id, msg, session)
-
-                    try:
-                        client.beta.threads.delete(thread_id=thread_id)
-                        logger.info(f"Thread completed -> deleting thread {thread_id}")
-                    except Exception as e:
-                        logger.warning(f"Failed to delete thread {thread_id}: {e}")
+            assistant_pk = await get_assistant_pk(assistant_id)
 
-                    return
-
-                elif run.status == "failed":
+            # paragraphs are persisted as they are written; a run that does not complete
+            # takes its draft with it
+            draft = ArticleDraft(short_id, thread_id, assistant_pk)
+            try:
+                run = await follow_run(client, thread_id, assistant_id, on_text=draft.feed)
+                if run.status == "failed":
                     logger.warning("Run failed, attempting one retry...")
-                    try:
-                        run = client.beta.threads.runs.create(
-                            thread_id=thread_id, assistant_id=assistant_id
-                        )
-                        continue
-                    except Exception as retry_error:
-                        raise Exception(f"Run failed and retry failed: {retry_error}")
-                elif run.status == "requires_action":
-                    raise Exception("Run requires action - not implemented")
-
-                time.sleep(5)
-
-        except Exception as e:
+                    await draft.discard()
+                    draft = ArticleDraft(short_id, thread_id, assistant_pk)
+                    run = await follow_run(client, thread_id, assistant_id, on_text=draft.feed)
+            except (APIConnectionError, httpx.HTTPError) as e:
+                # the run is lost to us; start over on a fresh thread
+                logger.error(f"Error following run: {e}")
+                await draft.discard()
+                continue
+
+            if run.status == "requires_action":
+                raise Exception("Run requires action - not implemented")
+            if run.status != "completed":
+                raise Exception(f"Run ended as {run.status}: {run.last_error}")
+
+            articles = []
+            messages = await client.beta.threads.messages.list(thread_id=thread_id)
+            async for msg in messages:
+                article = await save_to_database(short_id, msg, draft, assistant_pk)
+                if article is not None:
+                    articles.append(article)
+            if not articles:
+                raise Exception("The run completed without an answer")
+
+            try:
+                await client.beta.threads.delete(thread_id=thread_id)
+                logger.info(f"Thread completed -> deleting thread {thread_id}")
+            except Exception as e:
+                logger.warning(f"Failed to delete thread {thread_id}: {e}")
+
+            await report("done")
+            break
+
+        except BaseException as e:
+            if draft is not None:
+                # also when cancelled: the job is queued again and starts a new draft
+                await asyncio.shield(draft.discard())
+            if not isinstance(e, Exception):
+                raise
             logger.error(f"Attempt {attempt + 1} failed for language {lang}: {str(e)}")
             if "Rate limit" in str(e) or "Thread limit" in str(e):
                 if attempt < max_retries - 1:
                     logger.info(
                         f"Rate/Thread limit reached. Waiting {retry_delay} seconds before retry..."
                     )
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(retry_delay)
                     continue
 
             logger.error(f"Failed to generate content for {lang} after {attempt + 1} attempts")
+            await report("failed")
             raise
 
+    else:
+        # every attempt lost track of its run
+        await report("failed")
+        return
 
-def save_to_database(short_id: str, data: Message, session: Session):
+    # the articles are published by now; a missing image must not undo that
+    for article in articles:
+        if language_registry.code_for(article.lang_id) != "en":
+            continue
+        try:
+            await generate_image(article.image_prompt, short_id)
+        except Exception as e:
+            logger.error(f"Error generating the image of {short_id}: {e}")
+
+
+def parse_article(text: str) -> dict:
+    """Decode the assistant's JSON answer, with or without a ```json fence."""
+    cleaned_str = text.strip()
+
+    if cleaned_str.startswith("```json"):
+        cleaned_str = cleaned_str[7:]
+    if cleaned_str.endswith("```"):
+        cleaned_str = cleaned_str[:-3]
+    content = json.loads(cleaned_str)
+    content["language"] = language_code(content["language"])
+    return content
+
+
+async def get_assistant_pk(assistant_id: str) -> uuid.UUID | None:
+    """Our primary key of a cloud assistant."""
+    assistant_pk = assistant_registry.pk_for(assistant_id)
+    if assistant_pk is None:
+        # stored by another process since we last looked
+        async with AsyncSessionLocal() as session:
+            await assistant_registry.refresh(session)
+        assistant_pk = assistant_registry.pk_for(assistant_id)
+    return assistant_pk
+
+
+async def save_to_database(
+    short_id: str,
+    data: Message,
+    draft: ArticleDraft | None = None,
+    assistant_pk: uuid.UUID | None = None,
+) -> Article | None:
+    """
+    Save an assistant answer, finishing its draft when the answer was streamed into one.
+    Returns the article, or None for a message that is not an answer; raises when the answer
+    is not a usable article.
+    """
     if data.role != "assistant":
-        return
+        return None
 
     try:
-        content = data.content[0].text.value
-        cleaned_str = content.strip()
-
-        if cleaned_str.startswith("```json"):
-            cleaned_str = cleaned_str[7:]
-        if cleaned_str.endswith("```"):
-            cleaned_str = cleaned_str[:-3]
-        content = json.loads(cleaned_str)
-        if content["language"] == "cz":
-            content["language"] = "cs"
+        content = parse_article(data.content[0].text.value)
+        article_data = requests.ArticleData(
+            lang=content["language"],
+            title=content["title"],
+            intro=content["perex"],
+            paragraphs=content["paragraphs"],
+            keywords=content["keywords"],
+            imagePrompt=content["image_prompt"],
+            social=content["twitter"],
+        )
     except Exception as e:
         logger.error(f"invalid data: \n{data.content[0].text.value}")
         logger.error(e)
-        return
-
-    try:
-        lang_id = session.query(Language).filter(Language.code == content["language"]).first().id
-    except Exception as e:
-        logger.error(content["language"])
-        logger.error(e)
-        return
-
-    assistant_id = (
-        session.query(OpenAIAssistant)
-        .filter(OpenAIAssistant.assistant_id == data.assistant_id)
-        .first()
-        .id
-    )
-
-    article = Article(
-        short_id=short_id,
-        title=content["title"],
-        perex=content["perex"],
-        assistant_id=assistant_id,
-        lang_id=lang_id,
-        thread_id=data.thread_id,
-        image_prompt=content["image_prompt"],
-        twitter_text=content["twitter"],
-    )
-    session.add(article)
-    session.commit()
-
-    paragraphs = content["paragraphs"]
-    logger.debug(f"article in {content['language']} added")
-
-    for idx, paragraph in enumerate(paragraphs):
-        session.add(Paragraph(content=paragraph, order=idx, article_id=article.id))
-
-    session.commit()
-    logger.debug("paragraphs added")
-
-    keywords = content["keywords"]
-    for keyword in keywords:
-        try:
-            session.add(Keyword(keyword=keyword, article_id=article.id, lang_id=lang_id))
-            session.commit()
-        except Exception:
-            session.rollback()
+        if draft is not None and draft.message_id == data.id:
+            await draft.discard()
+        raise Exception(f"Invalid article from the assistant: {e}") from e
+
+    lang_id = language_registry.id_for(article_data.lang)
+    if lang_id is None:
+        logger.error(f"Unknown language: {article_data.lang}")
+        raise Exception(f"Unknown language: {article_data.lang}")
+
+    article = None
+    if draft is not None and draft.message_id == data.id:
+        article = await draft.finish(article_data)
+
+    if article is None:
+        if assistant_pk is None:
+            assistant_pk = await get_assistant_pk(data.assistant_id)
+
+        async with AsyncSessionLocal() as session:
+            # same path as POST /api/generate/article: keywords are upserted and linked,
+            # paragraphs and the read document written in one transaction
+            article = await ingest_article(
+                session,
+                article_data,
+                lang_id,
+                short_id,
+                assistant_id=assistant_pk,
+                thread_id=data.thread_id,
+            )
+            await session.commit()
 
-    logger.debug("keywords added")
+    logger.debug(f"article in {article_data.lang} added")
 
-    if content["language"] == "en":
-        generate_image(content["image_prompt"], client, short_id)
+    response_cache.invalidate()
+    related_index.add(article)
 
+    return article
 
-def generate_image(prompt, client, short_id="dummy_image"):
-    if client is None:
-        client = OpenAI(organization=OPENAI_ORGANIZATION_ID, project=OPENAI_PROJECT_ID)
 
-    response = client.images.generate(model="dall-e-3", prompt=prompt, n=1, size="1024x1024")
+async def generate_image(prompt, short_id="dummy_image"):
+    response = await get_client().images.generate(
+        model="dall-e-3", prompt=prompt, n=1, size="1024x1024"
+    )
     # The response includes URLs to the generated images
     image_url = response.data[0].url
 
-    image_response = requests.get(image_url)
+    async with httpx.AsyncClient() as http:
+        image_response = await http.get(image_url)
     if image_response.status_code == 200:
         # Save the image to a file
         with open(f"{short_id}.png", "wb") as f:
             f.write(image_response.content)
         logger.info("Image successfully downloaded.")
-        upload_file_to_s3(f"{short_id}.png")
+        # boto3 blocks; keep it off the event loop
+        await asyncio.to_thread(upload_file_to_s3, f"{short_id}.png")
 
     else:
         logger.info("Failed to download the image.")
@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO
+
+from loguru import logger
+
+from db.database import init_languages
+from db.dependencies import AsyncSessionLocal
+from db.documents import BACKFILL_BATCH_SIZE, backfill_documents
+from db.exporter import EXPORT_BATCH_SIZE, export_articles
+from db.importer import IMPORT_CHUNK_SIZE, import_articles, iter_json_array, iter_ndjson
+from db.languages import language_registry
+
+READ_SIZE = 1 << 16
+
+
+async def read_chunks(file: BinaryIO) -> AsyncIterator[bytes]:
+    while chunk := await asyncio.to_thread(file.read, READ_SIZE):
+        yield chunk
+
+
+async def import_command(args: argparse.Namespace):
+    await init_languages()
+
+    ndjson = args.format == "ndjson" or (
+        args.format is None and args.file.endswith((".ndjson", ".jsonl"))
+    )
+
+    with open(args.file, "rb") if args.file != "-" else sys.stdin.buffer as file:
+        chunks = read_chunks(file)
+        records = iter_ndjson(chunks) if ndjson else iter_json_array(chunks)
+        report = await import_articles(AsyncSessionLocal, records, args.chunk_size)
+
+    for failure in report.failed:
+        logger.error(f"#{failure.index}: {failure.error}")
+    logger.info(f"Imported {report.imported} articles, {len(report.failed)} failed")
+
+
+async def export_command(args: argparse.Namespace):
+    await init_languages()
+
+    lang_id = None
+    if args.lang is not None:
+        lang_id = language_registry.id_for(args.lang)
+        if lang_id is None:
+            raise SystemExit(f"Unknown language: {args.lang}")
+
+    lines = export_articles(
+        AsyncSessionLocal, lang_id, args.published_from, args.published_to, args.batch_size
+    )
+
+    with open(args.file, "wb") if args.file != "-" else sys.stdout.buffer as file:
+        async for chunk in lines:
+            await asyncio.to_thread(file.write, chunk)
+
+
+async def backfill_documents_command(args: argparse.Namespace):
+    total = await backfill_documents(AsyncSessionLocal, args.batch_size)
+    logger.info(f"Backfilled documents of {total} articles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI articles backend commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="bulk import ArticleData records")
+    import_parser.add_argument("file", help="JSON array or NDJSON file, '-' for stdin")
+    import_parser.add_argument("--format", choices=["json", "ndjson"])
+    import_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    import_parser.set_defaults(handler=import_command)
+
+    export_parser = commands.add_parser("export", help="stream articles as NDJSON")
+    export_parser.add_argument("file", nargs="?", default="-", help="output file, '-' for stdout")
+    export_parser.add_argument("--lang", help="language code, all languages when omitted")
+    export_parser.add_argument("--from", dest="published_from", type=datetime.fromisoformat)
+    export_parser.add_argument("--to", dest="published_to", type=datetime.fromisoformat)
+    export_parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    export_parser.set_defaults(handler=export_command)
+
+    backfill_parser = commands.add_parser(
+        "backfill-documents", help="build the read documents of older articles"
+    )
+    backfill_parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    backfill_parser.set_defaults(handler=backfill_documents_command)
+
+    args = parser.parse_args()
+    asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
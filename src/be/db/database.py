@@ -3,14 +3,16 @@ from typing import List
 import iso639  # You'll need to add this to your dependencies
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from sqlalchemy_utils import database_exists, create_database
-from db.models import Base, Article, Language, ArticleKeyword, Paragraph
+from db.languages import language_registry
+from db.models import Base, Language
 
 # from logger_config import logger
 from loguru import logger
-from models.responses import Keyword
 from alembic import command
 from alembic.config import Config
 
@@ -22,11 +24,40 @@ DB_HOST = os.getenv("AI_ART_DB_HOST")
 DB_PORT = os.getenv("AI_ART_DB_PORT")
 DB_NAME = os.getenv("AI_ART_DB_NAME")
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+DB_POOL_SIZE = int(os.getenv("AI_ART_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("AI_ART_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("AI_ART_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("AI_ART_DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("AI_ART_DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+def pool_options() -> dict:
+    """Pool settings of the async engine; each worker process holds one such pool."""
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    # only startup (tables, migrations, languages) and the CLI use blocking connections;
+    # pooling them would keep idle connections open for the life of every worker
+    return create_engine(url, poolclass=NullPool)
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL) -> AsyncEngine:
+    return create_async_engine(url, **pool_options())
+
+
+engine = create_db_engine()
+async_engine = create_async_db_engine()
 
 Session = sessionmaker(bind=engine)
-session = Session()
 
 
 def upgrade_database_to_latest():
@@ -74,6 +105,8 @@ async def init_languages():
             else:
                 logger.info(f"Languages table already contains {language_count} entries")
 
+            language_registry.load(session)
+
     except Exception as e:
         logger.error(f"Error initializing languages: {e}")
         raise
@@ -96,37 +129,3 @@ async def init_db():
     await init_languages()
 
     upgrade_database_to_latest()
-
-
-def insert_article(title: str, content: str, lang: str) -> Article:
-    lang_id = session.query(Language).filter(Language.code == lang).first().id
-
-    item = Article(title=title, content=content, lang_id=lang_id)
-    session.add(item)
-    session.commit()
-
-    return item
-
-
-def insert_paragraph(content: str, idx: int, article_id: str) -> Article:
-    item = Paragraph(content=content, order=idx, article_id=article_id)
-    session.add(item)
-    session.commit()
-
-    return item
-
-
-def insert_keyword(keyword: str, lang: str) -> Keyword:
-    lang_id = session.query(Language).filter(Language.code == lang).first().id
-
-    item = Keyword(keyword=keyword, lang_id=lang_id)
-    session.add(item)
-    session.commit()
-
-    return item
-
-
-def insert_keyword_article(keyword_id: int, article_id: int):
-    item = ArticleKeyword(keyword_id=keyword_id, article_id=article_id)
-    session.add(item)
-    session.commit()
@@ -0,0 +1,124 @@
+import os
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+
+import models.responses as responses
+from db.models import Article, ArticleKeyword, Keyword, Paragraph
+
+BACKFILL_BATCH_SIZE = int(os.getenv("AI_ART_BACKFILL_BATCH_SIZE", "500"))
+
+
+def build_document(
+    title: Optional[str],
+    perex: Optional[str],
+    paragraphs: Iterable[str],
+    keywords: Iterable[str],
+    image_url: Optional[str] = None,
+) -> dict:
+    """
+    Everything a read needs besides the `articles` row itself, stored in `Article.document`.
+
+    Paragraphs keep their order; keywords are deduplicated the way ingest links them.
+    """
+    return {
+        "title": title,
+        "perex": perex,
+        "paragraphs": list(paragraphs),
+        "keywords": list(dict.fromkeys(keyword for keyword in keywords if keyword)),
+        "imageUrl": image_url,
+    }
+
+
+def teaser(article: Article, lang: str) -> responses.ArticleTeaser:
+    """The short form of an article used by rails and lists."""
+    return responses.ArticleTeaser(
+        publicId=article.short_id,
+        title=article.title,
+        imageUrl=article.image_url,
+        url=f"/{lang}/{article.short_id}/{article.seo_slug}",
+    )
+
+
+def document_from_relations(article: Article) -> dict:
+    """Build the document of an article whose paragraphs and keywords are loaded."""
+    return build_document(
+        article.title,
+        article.perex,
+        [paragraph.content for paragraph in article.paragraphs],
+        [keyword.keyword for keyword in article.keywords],
+        article.image_url,
+    )
+
+
+async def load_missing_documents(db: AsyncSession, articles: Sequence[Article]):
+    """
+    Give articles without a stored document one built from their paragraphs and keywords.
+
+    Costs one query per collection for all such articles together and nothing when every
+    article has a document. The built documents are not written back; see backfill_documents.
+    """
+    missing = {article.id: article for article in articles if article.document is None}
+    if not missing:
+        return
+
+    paragraphs: Dict[uuid.UUID, List[str]] = {article_id: [] for article_id in missing}
+    rows = await db.execute(
+        select(Paragraph.article_id, Paragraph.content)
+        .where(Paragraph.article_id.in_(missing))
+        .order_by(Paragraph.article_id, Paragraph.order)
+    )
+    for article_id, content in rows:
+        paragraphs[article_id].append(content)
+
+    keywords: Dict[uuid.UUID, List[str]] = {article_id: [] for article_id in missing}
+    rows = await db.execute(
+        select(ArticleKeyword.article_id, Keyword.keyword)
+        .join(Keyword, Keyword.id == ArticleKeyword.keyword_id)
+        .where(ArticleKeyword.article_id.in_(missing))
+    )
+    for article_id, keyword in rows:
+        keywords[article_id].append(keyword)
+
+    for article_id, article in missing.items():
+        document = build_document(
+            article.title,
+            article.perex,
+            paragraphs[article_id],
+            keywords[article_id],
+            article.image_url,
+        )
+        # committed value: rendering must not turn a read into a pending write
+        set_committed_value(article, "document", document)
+
+
+async def backfill_documents(
+    session_factory: Callable[[], AsyncSession], batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """Fill `document` for articles written before it existed, one committed batch at a time."""
+    total = 0
+    query = (
+        select(Article)
+        .options(selectinload(Article.paragraphs), selectinload(Article.keywords))
+        .where(Article.document.is_(None))
+        .order_by(Article.id)
+        .limit(batch_size)
+    )
+
+    while True:
+        async with session_factory() as db:
+            articles = (await db.execute(query)).scalars().all()
+            if not articles:
+                return total
+
+            for article in articles:
+                article.document = document_from_relations(article)
+            await db.commit()
+
+        total += len(articles)
+        logger.info(f"Backfilled documents of {total} articles")
@@ -0,0 +1,68 @@
+import os
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+import models.responses as responses
+from db.languages import language_registry
+from db.models import Article
+
+EXPORT_BATCH_SIZE = int(os.getenv("AI_ART_EXPORT_BATCH_SIZE", "500"))
+
+
+def _exported(article: Article) -> responses.ExportedArticle:
+    return responses.ExportedArticle(
+        publicId=article.short_id,
+        lang=language_registry.code_for(article.lang_id) or "",
+        title=article.title,
+        intro=article.perex,
+        paragraphs=[paragraph.content for paragraph in article.paragraphs],
+        keywords=[keyword.keyword for keyword in article.keywords],
+        imagePrompt=article.image_prompt,
+        social=article.twitter_text,
+        imageUrl=article.image_url,
+        published=article.published,
+    )
+
+
+async def export_articles(
+    session_factory: Callable[[], AsyncSession],
+    lang_id: Optional[uuid.UUID] = None,
+    published_from: Optional[datetime] = None,
+    published_to: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the catalogue as NDJSON, one chunk per `batch_size` articles.
+
+    Rows come from a server-side cursor and each batch's paragraphs and keywords are loaded
+    with one selectin query per collection, so memory stays flat whatever the table size.
+    The session is opened here rather than taken from the request, because a streamed body
+    outlives the request's dependencies.
+    """
+    query = (
+        select(Article)
+        .options(selectinload(Article.paragraphs), selectinload(Article.keywords))
+        .where(Article.status == "ready")
+        .order_by(Article.published, Article.id)
+        .execution_options(yield_per=batch_size)
+    )
+    if lang_id is not None:
+        query = query.where(Article.lang_id == lang_id)
+    if published_from is not None:
+        query = query.where(Article.published >= published_from)
+    if published_to is not None:
+        query = query.where(Article.published < published_to)
+
+    async with session_factory() as db:
+        result = await db.stream(query)
+
+        async for batch in result.scalars().partitions():
+            # the identity map only holds weak references, so nothing keeps a finished
+            # batch alive once its lines are built
+            lines = [_exported(article).model_dump_json() for article in batch]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
@@ -0,0 +1,229 @@
+import codecs
+import json
+import os
+import re
+from typing import Any, AsyncIterator, Callable, List, Tuple
+
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models.requests as requests
+import models.responses as responses
+from db.ingest import ingest_article, ingest_articles
+from db.languages import language_registry
+from db.related import related_index
+
+IMPORT_CHUNK_SIZE = int(os.getenv("AI_ART_IMPORT_CHUNK_SIZE", "200"))
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# what a number or a literal cut off at the end of a chunk can look like
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+class RecordError(Exception):
+    """A single input record that could not be parsed."""
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Yield one decoded value (or RecordError) per non-empty line."""
+    buffer = b""
+
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode_line(line)
+
+    if buffer.strip():
+        yield _decode_line(buffer)
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return RecordError(f"invalid JSON: {e}")
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    # chunks may end mid-character; the incremental decoder carries the partial bytes over
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _cut_off(buffer: str, error: json.JSONDecodeError) -> bool:
+    """Whether decoding failed only because the buffer ends inside the value."""
+    tail = buffer[error.pos :]
+    if error.msg.startswith("Unterminated string"):
+        return True
+    if error.msg.startswith("Invalid \\uXXXX escape"):
+        # reported for an escape at the end of an unterminated string, however complete
+        return '"' not in tail
+    return bool(NUMBER_TAIL.match(tail)) or any(
+        literal.startswith(tail) for literal in LITERALS
+    )
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Yield the elements of a top-level JSON array as they arrive, without buffering the
+    whole document. A syntax error ends the stream, since there is no way to resynchronise.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    # "open" before the "[", then "first", "value" after a comma, "separator" after a value
+    expecting = "open"
+    texts = _iter_text(chunks)
+
+    while expecting != "done":
+        try:
+            text = await anext(texts)
+        except StopAsyncIteration:
+            break
+        except UnicodeDecodeError as e:
+            yield RecordError(f"invalid UTF-8: {e}")
+            return
+        buffer += text
+
+        while True:
+            buffer = buffer.lstrip()
+            if not buffer:
+                break
+
+            if expecting == "open":
+                if buffer[0] != "[":
+                    yield RecordError("expected a JSON array")
+                    return
+                expecting = "first"
+                buffer = buffer[1:]
+                continue
+
+            if expecting == "separator":
+                if buffer[0] not in ",]":
+                    yield RecordError(f"expected ',' or ']', found {buffer[:20]!r}")
+                    return
+                expecting = "value" if buffer[0] == "," else "done"
+                buffer = buffer[1:]
+                if expecting == "done":
+                    break
+                continue
+
+            if expecting == "first" and buffer[0] == "]":
+                expecting = "done"
+                break
+
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError as e:
+                if _cut_off(buffer, e):
+                    # incomplete element, wait for more data
+                    break
+                yield RecordError(f"invalid JSON: {e}")
+                return
+
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if NUMBER_TAIL.match(buffer, end):
+                    # the rest of the number may be in the next chunk
+                    break
+                if not (buffer[end].isspace() or buffer[end] in ",]"):
+                    yield RecordError(f"invalid number: {buffer[:end + 20]!r}")
+                    return
+
+            buffer = buffer[end:]
+            expecting = "separator"
+            yield value
+
+    if expecting != "done":
+        yield RecordError("unexpected end of JSON array")
+
+
+def iter_records(chunks: AsyncIterator[bytes], content_type: str) -> AsyncIterator[Any]:
+    if content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+        return iter_ndjson(chunks)
+    return iter_json_array(chunks)
+
+
+def _validate(record: Any) -> Tuple[requests.ArticleData, Any]:
+    if isinstance(record, RecordError):
+        raise record
+
+    data = requests.ArticleData.model_validate(record)
+    lang_id = language_registry.id_for(data.lang)
+    if lang_id is None:
+        raise RecordError(f"unknown language: {data.lang}")
+
+    return data, lang_id
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+            for detail in error.errors()
+        )
+    return str(error)
+
+
+async def import_articles(
+    session_factory: Callable[[], AsyncSession],
+    records: AsyncIterator[Any],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> responses.ImportReport:
+    """
+    Validate records one by one and load the valid ones in chunks, one transaction each.
+
+    A chunk that fails to load is retried article by article, so a bad record only fails
+    itself and the rest of the batch still goes in.
+    """
+    report = responses.ImportReport()
+    chunk: List[Tuple[int, requests.ArticleData, Any]] = []
+
+    async def flush():
+        try:
+            async with session_factory() as db:
+                items = [(data, lang_id) for _, data, lang_id in chunk]
+                articles = await ingest_articles(db, items)
+                await db.commit()
+            for article in articles:
+                related_index.add(article)
+            report.imported += len(articles)
+            report.shortIds.extend(article.short_id for article in articles)
+        except Exception as e:
+            logger.warning(f"Chunk of {len(chunk)} articles failed ({e}), retrying one by one")
+            for index, data, lang_id in chunk:
+                try:
+                    async with session_factory() as db:
+                        article = await ingest_article(db, data, lang_id)
+                        await db.commit()
+                    related_index.add(article)
+                    report.imported += 1
+                    report.shortIds.append(article.short_id)
+                except Exception as error:
+                    report.failed.append(responses.ImportFailure(index=index, error=str(error)))
+
+        chunk.clear()
+
+    index = -1
+    async for record in records:
+        index += 1
+        try:
+            data, lang_id = _validate(record)
+        except Exception as e:
+            report.failed.append(responses.ImportFailure(index=index, error=_describe(e)))
+            continue
+
+        chunk.append((index, data, lang_id))
+        if len(chunk) >= chunk_size:
+            await flush()
+
+    if chunk:
+        await flush()
+
+    logger.info(f"Imported {report.imported} of {index + 1} articles")
+    return report
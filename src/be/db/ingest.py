@@ -0,0 +1,214 @@
+import datetime
+import uuid
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models.requests as requests
+from db.documents import build_document
+from db.models import Article, ArticleKeyword, Keyword, Paragraph
+
+
+def new_short_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+async def upsert_keywords(
+    db: AsyncSession, keywords: Iterable[str], lang_id: uuid.UUID
+) -> Dict[str, uuid.UUID]:
+    """
+    Insert the missing keywords and return the ids of all of them, in one statement.
+
+    Keywords are unique across languages, so an existing keyword keeps its language. The
+    no-op DO UPDATE (rather than DO NOTHING) makes RETURNING include the existing rows too.
+    Rows are locked in sorted order so concurrent imports cannot deadlock on shared keywords.
+    """
+    unique = sorted({keyword for keyword in keywords if keyword})
+    if not unique:
+        return {}
+
+    statement = pg_insert(Keyword).values(
+        [{"id": uuid.uuid4(), "keyword": keyword, "lang_id": lang_id} for keyword in unique]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[Keyword.keyword], set_={"keyword": statement.excluded.keyword}
+    ).returning(Keyword.keyword, Keyword.id)
+
+    return {keyword: keyword_id for keyword, keyword_id in await db.execute(statement)}
+
+
+def _new_article(
+    data: requests.ArticleData,
+    lang_id: uuid.UUID,
+    short_id: Optional[str] = None,
+    assistant_id: Optional[uuid.UUID] = None,
+    thread_id: Optional[str] = None,
+) -> Article:
+    return Article(
+        id=uuid.uuid4(),
+        short_id=short_id or new_short_id(),
+        lang_id=lang_id,
+        title=data.title,
+        perex=data.intro,
+        image_prompt=data.imagePrompt,
+        twitter_text=data.social,
+        assistant_id=assistant_id,
+        thread_id=thread_id,
+        published=datetime.datetime.now(),
+        document=build_document(data.title, data.intro, data.paragraphs, data.keywords),
+    )
+
+
+async def _link_keywords(
+    db: AsyncSession, staged: Sequence[Tuple[Article, requests.ArticleData]]
+):
+    """Upsert the keywords of flushed articles (one statement per language) and link them."""
+    keywords_by_lang: Dict[uuid.UUID, List[str]] = {}
+    for article, data in staged:
+        keywords_by_lang.setdefault(article.lang_id, []).extend(data.keywords)
+
+    keyword_ids: Dict[str, uuid.UUID] = {}
+    for lang_id, keywords in keywords_by_lang.items():
+        keyword_ids.update(await upsert_keywords(db, keywords, lang_id))
+
+    links = {
+        (article.id, keyword_ids[keyword])
+        for article, data in staged
+        for keyword in data.keywords
+        if keyword
+    }
+    if links:
+        await db.execute(
+            insert(ArticleKeyword),
+            [
+                {"article_id": article_id, "keyword_id": keyword_id}
+                for article_id, keyword_id in links
+            ],
+        )
+
+
+async def _stage(db: AsyncSession, staged: Sequence[Tuple[Article, requests.ArticleData]]):
+    """
+    Insert articles with their keywords, keyword links and paragraphs.
+
+    Issues four statements (articles, one keyword upsert per language, links, paragraphs)
+    regardless of how many articles, paragraphs or keywords there are. Article ids are set
+    client-side, so the articles flush as a single batched INSERT.
+    """
+    db.add_all([article for article, _ in staged])
+    await db.flush()
+
+    await _link_keywords(db, staged)
+
+    paragraphs = [
+        {"content": paragraph, "order": idx, "article_id": article.id}
+        for article, data in staged
+        for idx, paragraph in enumerate(data.paragraphs)
+    ]
+    if paragraphs:
+        await db.execute(insert(Paragraph), paragraphs)
+
+
+async def ingest_article(
+    db: AsyncSession,
+    data: requests.ArticleData,
+    lang_id: uuid.UUID,
+    short_id: Optional[str] = None,
+    assistant_id: Optional[uuid.UUID] = None,
+    thread_id: Optional[str] = None,
+) -> Article:
+    """Stage one article; the caller owns the transaction and commits once."""
+    article = _new_article(data, lang_id, short_id, assistant_id, thread_id)
+    await _stage(db, [(article, data)])
+    return article
+
+
+async def ingest_articles(
+    db: AsyncSession, items: Sequence[Tuple[requests.ArticleData, uuid.UUID]]
+) -> List[Article]:
+    """Stage many (article, language id) pairs with the same four statements."""
+    staged = [(_new_article(data, lang_id), data) for data, lang_id in items]
+    await _stage(db, staged)
+    return [article for article, _ in staged]
+
+
+async def start_draft(
+    db: AsyncSession,
+    lang_id: uuid.UUID,
+    short_id: str,
+    title: Optional[str],
+    perex: Optional[str],
+    assistant_id: Optional[uuid.UUID] = None,
+    thread_id: Optional[str] = None,
+) -> Article:
+    """
+    Stage an article that is still being written: status "generating", so it is readable by
+    its public id but kept out of every listing until finished.
+    """
+    article = Article(
+        id=uuid.uuid4(),
+        short_id=short_id,
+        lang_id=lang_id,
+        title=title,
+        perex=perex,
+        assistant_id=assistant_id,
+        thread_id=thread_id,
+        status="generating",
+        document=build_document(title, perex, [], []),
+    )
+    db.add(article)
+    await db.flush()
+    return article
+
+
+async def add_draft_paragraphs(db: AsyncSession, article: Article, paragraphs: Sequence[str]):
+    """Append paragraphs to a draft, to its paragraph rows and its document alike."""
+    if not paragraphs:
+        return
+
+    db.add(article)
+    written = article.document["paragraphs"]
+    await db.execute(
+        insert(Paragraph),
+        [
+            {"content": paragraph, "order": len(written) + idx, "article_id": article.id}
+            for idx, paragraph in enumerate(paragraphs)
+        ],
+    )
+    # a new dict, so the JSON column sees the change
+    article.document = build_document(article.title, article.perex, written + list(paragraphs), [])
+    await db.flush()
+
+
+async def finish_draft(db: AsyncSession, article: Article, data: requests.ArticleData):
+    """
+    Complete a draft from the final answer: the paragraphs that were not streamed, keyword
+    links, the remaining fields and the full document; it is published now.
+    """
+    db.add(article)
+    await add_draft_paragraphs(db, article, data.paragraphs[len(article.document["paragraphs"]) :])
+
+    article.title = data.title
+    article.perex = data.intro
+    article.seo_slug = Article.create_seo_slug(data.title)
+    article.image_prompt = data.imagePrompt
+    article.twitter_text = data.social
+    article.document = build_document(data.title, data.intro, data.paragraphs, data.keywords)
+    article.status = "ready"
+    article.published = datetime.datetime.now()
+    await _link_keywords(db, [(article, data)])
+    await db.flush()
+
+
+async def discard_draft(db: AsyncSession, article: Article):
+    await db.execute(delete(Paragraph).where(Paragraph.article_id == article.id))
+    await db.execute(delete(Article).where(Article.id == article.id))
+
+
+async def discard_drafts(db: AsyncSession, short_id: str) -> int:
+    """Remove the drafts of `short_id` an interrupted generation left behind."""
+    drafts = select(Article.id).where(Article.short_id == short_id, Article.status == "generating")
+    await db.execute(delete(Paragraph).where(Paragraph.article_id.in_(drafts)))
+    return (await db.execute(delete(Article).where(Article.id.in_(drafts)))).rowcount
@@ -0,0 +1,56 @@
+import uuid
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from db.models import Language
+
+languages_statement = select(Language.code, Language.id).order_by(Language.name)
+
+
+class LanguageRegistry:
+    """
+    Process-wide code <-> id mapping of the languages table.
+
+    The table is seeded once by `init_languages` and never changes afterwards, so it is
+    loaded at startup and only re-read when `refresh` is called.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, uuid.UUID] = {}
+        self._codes: Dict[uuid.UUID, str] = {}
+
+    def _replace(self, rows: Iterable[Tuple[str, uuid.UUID]]):
+        ids: Dict[str, uuid.UUID] = {}
+        codes: Dict[uuid.UUID, str] = {}
+
+        for code, language_id in rows:
+            codes[language_id] = code
+            # ISO entries without a two-letter code are stored with an empty one
+            if code and code not in ids:
+                ids[code] = language_id
+
+        self._ids, self._codes = ids, codes
+
+        logger.info(f"Loaded {len(ids)} language codes")
+
+    def load(self, session: Session):
+        self._replace(session.execute(languages_statement).all())
+
+    async def refresh(self, db: AsyncSession):
+        self._replace((await db.execute(languages_statement)).all())
+
+    def id_for(self, code: str) -> Optional[uuid.UUID]:
+        return self._ids.get(code)
+
+    def code_for(self, language_id: uuid.UUID) -> Optional[str]:
+        return self._codes.get(language_id)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+language_registry = LanguageRegistry()
@@ -4,10 +4,10 @@ import datetime
 import re
 import uuid
 
-from sqlalchemy import Column, String, ForeignKey, Integer, DateTime
+from sqlalchemy import JSON, Column, String, ForeignKey, Index, Integer, DateTime, Uuid
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy_utils import UUIDType
 
 Base = declarative_base()
 
@@ -15,7 +15,7 @@ Base = declarative_base()
 class Article(Base):
     __tablename__ = "articles"
 
-    id = Column(UUIDType(binary=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     header = Column(String)
     title = Column(String)
     perex = Column(String)
@@ -24,14 +24,28 @@ class Article(Base):
     seo_slug = Column(String)
     visited = Column(Integer, default=0)
     last_visit = Column(DateTime(timezone=True))
-    published = Column(DateTime(timezone=True), default=datetime.datetime.now())
+    published = Column(DateTime(timezone=True), default=datetime.datetime.now)
     short_id = Column(String(8), unique=False, nullable=False)
-    lang_id = Column(UUIDType(binary=True), ForeignKey("languages.id"))
-    paragraphs = relationship("Paragraph", back_populates="article")
+    lang_id = Column(Uuid, ForeignKey("languages.id"))
+    paragraphs = relationship(
+        "Paragraph", back_populates="article", order_by="Paragraph.order"
+    )
+    keywords = relationship("Keyword", secondary="article_keywords", viewonly=True)
     note = Column(String)
-    assistant_id = Column(UUIDType(binary=True), ForeignKey("openai_assistants.id"))
+    assistant_id = Column(Uuid, ForeignKey("openai_assistants.id"))
     thread_id = Column(String)
     twitter_text = Column(String)
+    # "generating" while the assistant is still writing it (see ai.drafts), then "ready"
+    status = Column(String, nullable=False, default="ready", server_default="ready")
+    # precomputed read model (see db.documents); NULL for rows written before it existed
+    document = Column(JSON().with_variant(JSONB(), "postgresql"))
+
+    __table_args__ = (
+        # backs the keyset pagination of the homepage (newest first, per language)
+        Index("ix_articles_lang_id_published_id", "lang_id", "published", "id"),
+        # one language variant of an article; also serves lookups by short_id alone
+        Index("ix_articles_short_id_lang_id", "short_id", "lang_id"),
+    )
 
     @staticmethod
     def create_short_id():
@@ -56,45 +70,70 @@ class Article(Base):
 class Paragraph(Base):
     __tablename__ = "paragraphs"
 
-    id = Column(UUIDType(binary=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     content = Column(String)
     order = Column(Integer)
-    article_id = Column(UUIDType(binary=True), ForeignKey("articles.id"))
+    article_id = Column(Uuid, ForeignKey("articles.id"))
     article = relationship("Article", back_populates="paragraphs")
 
+    # paragraphs are always read per article, in order
+    __table_args__ = (Index("ix_paragraphs_article_id_order", "article_id", "order"),)
+
 
 class Keyword(Base):
     __tablename__ = "keywords"
 
-    id = Column(UUIDType(binary=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     keyword = Column(String, unique=True, nullable=False)
     label = Column(String)
-    lang_id = Column(UUIDType(binary=True), ForeignKey("languages.id"))
-    article_id = Column(UUIDType(binary=True), ForeignKey("articles.id"))
+    lang_id = Column(Uuid, ForeignKey("languages.id"), index=True)
+    article_id = Column(Uuid, ForeignKey("articles.id"))
 
 
 class Language(Base):
     __tablename__ = "languages"
 
-    id = Column(UUIDType(binary=True), primary_key=True, default=uuid.uuid4)
-    code = Column(String)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    code = Column(String, index=True)
     name = Column(String)
 
 
 class ArticleKeyword(Base):
     __tablename__ = "article_keywords"
 
-    article_id = Column(UUIDType(binary=True), ForeignKey("articles.id"), primary_key=True)
-    keyword_id = Column(UUIDType(binary=True), ForeignKey("keywords.id"), primary_key=True)
+    article_id = Column(Uuid, ForeignKey("articles.id"), primary_key=True)
+    keyword_id = Column(
+        Uuid, ForeignKey("keywords.id"), primary_key=True, index=True
+    )
+
+
+class GenerationJob(Base):
+    """A queued POST /api/oai/command request; see ai.jobs."""
+
+    __tablename__ = "generation_jobs"
+
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
+    topic = Column(String, nullable=False)
+    # queued -> running -> done | failed
+    status = Column(String, nullable=False, default="queued")
+    short_id = Column(String(8), nullable=False)
+    # generation language -> queued | running | done | failed
+    languages = Column(JSON().with_variant(JSONB(), "postgresql"))
+    error = Column(String)
+    created = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    updated = Column(DateTime(timezone=True), default=datetime.datetime.now)
+
+    # workers claim the oldest queued job
+    __table_args__ = (Index("ix_generation_jobs_status_created", "status", "created"),)
 
 
 class OpenAIAssistant(Base):
     __tablename__ = "openai_assistants"
-    id = Column(UUIDType(binary=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     assistant_id = Column(String)
     instructions = Column(String)
     model = Column(String)
     description = Column(String)
     name = Column(String)
-    datetime_created = Column(DateTime(timezone=True), default=datetime.datetime.now())
-    datetime_updated = Column(DateTime(timezone=True), default=datetime.datetime.now())
+    datetime_created = Column(DateTime(timezone=True), default=datetime.datetime.now)
+    datetime_updated = Column(DateTime(timezone=True), default=datetime.datetime.now)
@@ -0,0 +1,54 @@
+import threading
+
+from sqlalchemy import Engine, event
+
+from db.database import async_engine
+
+
+class PoolMonitor:
+    """
+    Tracks checkouts on an engine's connection pool.
+
+    SQLAlchemy has no event for "a checkout had to wait", so `saturated_checkouts` counts the
+    checkouts that took the last free connection (pool and overflow both used up); every
+    checkout that follows one of them waits until a connection is returned, or fails after
+    `pool_timeout`.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.checkouts = 0
+        self.saturated_checkouts = 0
+        self.peak_checked_out = 0
+        self._lock = threading.Lock()
+
+        event.listen(engine, "checkout", self._on_checkout)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self.engine.pool
+        checked_out = pool.checkedout()
+
+        with self._lock:
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            if checked_out >= pool.size() + pool._max_overflow:
+                self.saturated_checkouts += 1
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "peak_checked_out": self.peak_checked_out,
+                "saturated_checkouts": self.saturated_checkouts,
+            }
+
+
+# pool events are registered on the synchronous core of the async engine
+async_pool_monitor = PoolMonitor(async_engine.sync_engine)
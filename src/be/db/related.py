@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import os
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models.responses as responses
+from db.documents import teaser
+from db.languages import language_registry
+from db.models import Article, ArticleKeyword, Keyword
+
+RELATED_MAX = int(os.getenv("AI_ART_RELATED_MAX", "20"))
+RELATED_SYNC_INTERVAL = float(os.getenv("AI_ART_RELATED_SYNC_INTERVAL", "60"))
+RELATED_LOAD_BATCH_SIZE = 5000
+
+# `published` is set before the commit, so a write can become visible after a later one;
+# each sync re-reads this far behind its watermark
+RELATED_SYNC_OVERLAP = timedelta(minutes=5)
+
+
+class RelatedIndex:
+    """
+    Keyword-overlap neighbours of every article, kept in memory.
+
+    Holds an inverted index of (language, keyword) -> article ids. The neighbours of an
+    article are the articles sharing at least one keyword with it, ranked by the Jaccard
+    similarity of their keyword sets; they are computed on first request and kept until an
+    article sharing one of those keywords is added. Articles are loaded at startup and added
+    by the write paths after their commit; `sync` picks up the ones other workers wrote,
+    reading only articles published since the newest one indexed.
+    """
+
+    def __init__(self, size: int = RELATED_MAX, interval: float = RELATED_SYNC_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self._keywords: Dict[uuid.UUID, FrozenSet[str]] = {}
+        self._languages: Dict[uuid.UUID, uuid.UUID] = {}
+        self._postings: Dict[Tuple[uuid.UUID, str], Set[uuid.UUID]] = {}
+        self._short_ids: Dict[Tuple[uuid.UUID, str], uuid.UUID] = {}
+        self._teasers: Dict[uuid.UUID, responses.ArticleTeaser] = {}
+        self._neighbours: Dict[uuid.UUID, List[uuid.UUID]] = {}
+        # newest `published` of the articles read from the database
+        self._watermark: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def _add(
+        self,
+        article_id: uuid.UUID,
+        language_id: uuid.UUID,
+        short_id: str,
+        keywords: Iterable[str],
+        item: responses.ArticleTeaser,
+    ):
+        keywords = frozenset(keyword for keyword in keywords if keyword)
+
+        self._keywords[article_id] = keywords
+        self._languages[article_id] = language_id
+        self._short_ids[(language_id, short_id)] = article_id
+        self._teasers[article_id] = item
+        self._neighbours.pop(article_id, None)
+
+        for keyword in keywords:
+            posting = self._postings.setdefault((language_id, keyword), set())
+            # whoever shares a keyword with the new article may now rank it
+            for other in posting:
+                self._neighbours.pop(other, None)
+            posting.add(article_id)
+
+    def add(self, article: Article):
+        """Index a committed article from its document."""
+        lang = language_registry.code_for(article.lang_id)
+        if lang is None or not article.document or article.status == "generating":
+            return
+
+        with self._lock:
+            self._add(
+                article.id,
+                article.lang_id,
+                article.short_id,
+                article.document["keywords"],
+                teaser(article, lang),
+            )
+
+    def _rank(self, article_id: uuid.UUID) -> List[uuid.UUID]:
+        keywords = self._keywords[article_id]
+        language_id = self._languages[article_id]
+
+        overlap: Counter = Counter()
+        for keyword in keywords:
+            overlap.update(self._postings[(language_id, keyword)])
+        del overlap[article_id]
+
+        def rank(other: uuid.UUID) -> Tuple[float, str]:
+            shared = overlap[other]
+            union = len(keywords) + len(self._keywords[other]) - shared
+            # most similar first; ties go to the lexically first short id so the order is stable
+            return -shared / union, self._teasers[other].publicId
+
+        return heapq.nsmallest(self.size, overlap, key=rank)
+
+    def related(
+        self, language_id: uuid.UUID, short_id: str, n: int
+    ) -> Optional[List[responses.ArticleTeaser]]:
+        """Up to `n` neighbours of an article, or None when the article is not indexed."""
+        with self._lock:
+            article_id = self._short_ids.get((language_id, short_id))
+            if article_id is None:
+                return None
+
+            neighbours = self._neighbours.get(article_id)
+            if neighbours is None:
+                neighbours = self._neighbours[article_id] = self._rank(article_id)
+
+            return [self._teasers[other] for other in neighbours[:n]]
+
+    async def _index(self, db: AsyncSession, since: Optional[datetime] = None) -> int:
+        """Index the ready articles published since `since` that are not indexed yet."""
+        query = (
+            select(
+                Article.id,
+                Article.lang_id,
+                Article.short_id,
+                Article.title,
+                Article.image_url,
+                Article.seo_slug,
+                Article.published,
+                Article.document["keywords"].label("keywords"),
+            )
+            # drafts are added when they are finished
+            .where(Article.status == "ready")
+            .execution_options(yield_per=RELATED_LOAD_BATCH_SIZE)
+        )
+
+        linked = (
+            select(ArticleKeyword.article_id, Keyword.keyword)
+            .join(Keyword, Keyword.id == ArticleKeyword.keyword_id)
+            .join(Article, Article.id == ArticleKeyword.article_id)
+            .where(Article.document.is_(None))
+        )
+
+        if since is not None:
+            query = query.where(Article.published >= since)
+            linked = linked.where(Article.published >= since)
+
+        links: Dict[uuid.UUID, List[str]] = {}
+        for article_id, keyword in await db.execute(linked):
+            links.setdefault(article_id, []).append(keyword)
+
+        count = 0
+        result = await db.stream(query)
+        async for row in result:
+            if row.published is not None and (
+                self._watermark is None or row.published > self._watermark
+            ):
+                self._watermark = row.published
+
+            lang = language_registry.code_for(row.lang_id)
+            if lang is None or row.id in self._keywords:
+                continue
+
+            keywords = row.keywords if row.keywords is not None else links.get(row.id, [])
+            with self._lock:
+                self._add(row.id, row.lang_id, row.short_id, keywords, teaser(row, lang))
+            count += 1
+
+        return count
+
+    async def load(self, session_factory: Callable[[], AsyncSession]):
+        """Index every article; keywords come from documents, or links for older rows."""
+        async with session_factory() as db:
+            count = await self._index(db)
+
+        logger.info(f"Indexed keywords of {count} articles for related articles")
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Index the articles other workers published since the newest one indexed."""
+        since = None if self._watermark is None else self._watermark - RELATED_SYNC_OVERLAP
+        return await self._index(db, since)
+
+    async def run(self, session_factory: Callable[[], AsyncSession]):
+        """Sync periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with session_factory() as session:
+                    added = await self.sync(session)
+                logger.debug(f"related index picked up {added} articles from other workers")
+            except Exception as e:
+                logger.error(f"Error syncing related articles: {e}")
+
+
+related_index = RelatedIndex()
@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, load_only
+
+import models.responses as responses
+from db.documents import teaser
+from db.languages import language_registry
+from db.models import Article
+
+TRENDING_HALF_LIFE = float(os.getenv("AI_ART_TRENDING_HALF_LIFE", "3600"))
+TRENDING_CAPACITY = int(os.getenv("AI_ART_TRENDING_CAPACITY", "100"))
+TRENDING_RECONCILE_INTERVAL = float(os.getenv("AI_ART_TRENDING_RECONCILE_INTERVAL", "60"))
+
+# scores are kept relative to a landmark time; past this many half-lives they are rescaled
+# so the exponentially growing weights stay far from float overflow
+RESCALE_HALF_LIVES = 64
+
+
+class TrendingTracker:
+    """
+    Per-language "most read lately" ranking kept in memory.
+
+    Every visit adds a weight of 2 ** (t / half_life) (forward decay), so scores compare as
+    if all of them had decayed to the present without ever being touched again. At most
+    `capacity` articles are tracked per language; a newcomer to a full table takes over the
+    lowest score (Space-Saving), which keeps the top of the ranking accurate in bounded
+    memory. Each worker only sees its own visits, so `reconcile` periodically adds the
+    visits the other workers flushed to `articles.visited`.
+    """
+
+    def __init__(
+        self,
+        half_life: float = TRENDING_HALF_LIFE,
+        capacity: int = TRENDING_CAPACITY,
+        interval: float = TRENDING_RECONCILE_INTERVAL,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.half_life = half_life
+        self.capacity = capacity
+        self.interval = interval
+        self._clock = clock
+        self._landmark = clock()
+        self._scores: Dict[uuid.UUID, Dict[uuid.UUID, float]] = {}
+        self._teasers: Dict[uuid.UUID, responses.ArticleTeaser] = {}
+        # visits recorded here since the last reconcile, and `visited` as last read
+        self._local: Dict[uuid.UUID, int] = {}
+        self._visited: Dict[uuid.UUID, int] = {}
+        self._reconciled_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def _weight(self) -> float:
+        now = self._clock()
+        if now - self._landmark > RESCALE_HALF_LIVES * self.half_life:
+            factor = 2.0 ** ((now - self._landmark) / self.half_life)
+            for scores in self._scores.values():
+                for article_id in scores:
+                    scores[article_id] /= factor
+            self._landmark = now
+        return 2.0 ** ((now - self._landmark) / self.half_life)
+
+    def _add(
+        self,
+        language_id: uuid.UUID,
+        article_id: uuid.UUID,
+        item: responses.ArticleTeaser,
+        amount: float,
+    ):
+        scores = self._scores.setdefault(language_id, {})
+        score = scores.get(article_id)
+
+        if score is None:
+            score = 0.0
+            if len(scores) >= self.capacity:
+                evicted = min(scores, key=scores.__getitem__)
+                score = scores.pop(evicted)
+                self._teasers.pop(evicted, None)
+
+        scores[article_id] = score + amount
+        self._teasers[article_id] = item
+
+    def record(
+        self, language_id: uuid.UUID, article_id: uuid.UUID, item: responses.ArticleTeaser
+    ):
+        with self._lock:
+            self._add(language_id, article_id, item, self._weight())
+            self._local[article_id] = self._local.get(article_id, 0) + 1
+
+    def top(self, language_id: uuid.UUID, k: int) -> List[responses.ArticleTeaser]:
+        with self._lock:
+            scores = self._scores.get(language_id, {})
+            best = heapq.nlargest(k, scores, key=scores.__getitem__)
+            return [self._teasers[article_id] for article_id in best]
+
+    async def reconcile(self, db: AsyncSession) -> int:
+        """
+        Add the visits other workers wrote to the database since the last reconcile.
+
+        Reads only articles visited since then, `capacity` per language. Own visits that were
+        recorded here but not flushed yet are counted again on the next reconcile; the error
+        is bounded by one visit-flush interval.
+        """
+        now = datetime.now()
+        since = self._reconciled_at or now - timedelta(seconds=self.interval)
+
+        ranked = (
+            select(
+                Article,
+                func.row_number()
+                .over(partition_by=Article.lang_id, order_by=Article.visited.desc())
+                .label("rank"),
+            )
+            .where(Article.last_visit >= since)
+            .subquery()
+        )
+        recent = aliased(Article, ranked)
+        query = (
+            select(recent)
+            .options(
+                load_only(
+                    recent.short_id,
+                    recent.title,
+                    recent.image_url,
+                    recent.seo_slug,
+                    recent.lang_id,
+                    recent.visited,
+                )
+            )
+            .where(ranked.c.rank <= self.capacity)
+        )
+        articles = (await db.execute(query)).scalars().all()
+
+        with self._lock:
+            weight = self._weight()
+            visited: Dict[uuid.UUID, int] = {}
+            added = 0
+
+            for article in articles:
+                lang = language_registry.code_for(article.lang_id)
+                visited[article.id] = article.visited or 0
+                if lang is None or article.id not in self._visited:
+                    # first sight: only remember the baseline
+                    continue
+
+                delta = visited[article.id] - self._visited[article.id]
+                others = delta - self._local.get(article.id, 0)
+                if others > 0:
+                    self._add(article.lang_id, article.id, teaser(article, lang), others * weight)
+                    added += others
+
+            # baselines of tracked articles survive windows without visits
+            self._visited.update(visited)
+            tracked = {article_id for scores in self._scores.values() for article_id in scores}
+            self._visited = {
+                article_id: count
+                for article_id, count in self._visited.items()
+                if article_id in tracked or article_id in visited
+            }
+            self._local = {}
+            self._reconciled_at = now
+
+        return added
+
+    async def run(self, session_factory: Callable[[], AsyncSession]):
+        """Reconcile periodically until cancelled."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with session_factory() as session:
+                    added = await self.reconcile(session)
+                logger.debug(f"trending reconciled {added} visits from other workers")
+            except Exception as e:
+                logger.error(f"Error reconciling trending articles: {e}")
+
+
+trending_tracker = TrendingTracker()
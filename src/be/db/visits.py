@@ -0,0 +1,106 @@
+import asyncio
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Tuple
+
+from loguru import logger
+from sqlalchemy import bindparam, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import Article
+
+VISIT_FLUSH_INTERVAL = float(os.getenv("AI_ART_VISIT_FLUSH_INTERVAL", "10"))
+VISIT_MAX_PENDING = int(os.getenv("AI_ART_VISIT_MAX_PENDING", "1000"))
+
+articles = Article.__table__
+
+flush_visits_statement = (
+    update(articles)
+    .where(articles.c.id == bindparam("b_id"))
+    .values(
+        visited=func.coalesce(articles.c.visited, 0) + bindparam("b_count"),
+        last_visit=bindparam("b_last_visit"),
+    )
+)
+
+
+class VisitCounter:
+    """
+    Accumulates article visits in memory and writes them back in one batched UPDATE.
+
+    Each worker keeps its own counts. Visits recorded since the last flush are lost if the
+    worker dies, so the loss window is bounded by `interval` seconds (or `max_pending`
+    distinct articles, whichever comes first).
+    """
+
+    def __init__(
+        self, interval: float = VISIT_FLUSH_INTERVAL, max_pending: int = VISIT_MAX_PENDING
+    ):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[uuid.UUID, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+
+    def record(self, article_id: uuid.UUID):
+        with self._lock:
+            count, _ = self._pending.get(article_id, (0, None))
+            self._pending[article_id] = (count + 1, datetime.now())
+            pending = len(self._pending)
+
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def _drain(self) -> Dict[uuid.UUID, Tuple[int, datetime]]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def _restore(self, pending: Dict[uuid.UUID, Tuple[int, datetime]]):
+        with self._lock:
+            for article_id, (count, last_visit) in pending.items():
+                current, current_last_visit = self._pending.get(article_id, (0, last_visit))
+                self._pending[article_id] = (current + count, max(last_visit, current_last_visit))
+
+    async def flush(self, session_factory: Callable[[], AsyncSession]) -> int:
+        """Write all pending visits in a single executemany UPDATE and return the row count."""
+        pending = self._drain()
+        if not pending:
+            return 0
+
+        params = [
+            {"b_id": article_id, "b_count": count, "b_last_visit": last_visit}
+            for article_id, (count, last_visit) in pending.items()
+        ]
+
+        try:
+            async with session_factory() as session:
+                await session.execute(flush_visits_statement, params)
+                await session.commit()
+        except BaseException:
+            # keep the counts for the next attempt instead of dropping them; this includes
+            # a cancel at shutdown, whose final flush then writes them
+            self._restore(pending)
+            raise
+
+        logger.debug(f"flushed visits for {len(params)} articles")
+        return len(params)
+
+    async def run(self, session_factory: Callable[[], AsyncSession]):
+        """Flush periodically until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush(session_factory)
+            except Exception as e:
+                logger.error(f"Error flushing visits: {e}")
+
+
+visit_counter = VisitCounter()
@@ -1,16 +1,25 @@
+import asyncio
+
 from loguru_handler import LoguruHandler
 from fastapi.concurrency import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 
-from db.database import init_db
-from db.dependencies import get_db
+from ai.assistants import assistant_registry
+from ai.jobs import job_queue
+from ai.openai_assistant import close_client, get_client
+from db.database import async_engine, init_db
+from db.dependencies import AsyncSessionLocal, get_db
+from db.related import related_index
+from db.trending import trending_tracker
+from db.visits import visit_counter
 
 # from logger_config import logger
 from loguru import logger
 from routers.articles import articles_router
 from routers.data_generator import generator_router
 from routers.openai import openai_router
+from routers.status import status_router
 import logging
 import sentry_sdk
 
@@ -34,9 +43,25 @@ async def startup_event(app: FastAPI):
 
     logger.info("Starting up the FastAPI app")
     await init_db()
+    await related_index.load(AsyncSessionLocal)
+    visit_flusher = asyncio.create_task(visit_counter.run(AsyncSessionLocal))
+    trending_reconciler = asyncio.create_task(trending_tracker.run(AsyncSessionLocal))
+    related_sync = asyncio.create_task(related_index.run(AsyncSessionLocal))
+    job_workers = asyncio.create_task(job_queue.run(AsyncSessionLocal))
+    assistant_sync = asyncio.create_task(assistant_registry.run(AsyncSessionLocal, get_client))
     logger.info("Server is running on http://0.0.0.0:8000")
     yield
 
+    tasks = [assistant_sync, job_workers, related_sync, trending_reconciler, visit_flusher]
+    for task in tasks:
+        task.cancel()
+    # let them wind down while the engine is still there: an interrupted job is queued
+    # again and a flush cancelled in flight puts its visits back for the last one
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await visit_counter.flush(AsyncSessionLocal)
+    await close_client()
+    await async_engine.dispose()
+
 
 def run():
     import uvicorn
@@ -52,6 +77,7 @@ app = FastAPI(lifespan=startup_event)
 app.include_router(openai_router, prefix="/api/oai", tags=["openai"])
 app.include_router(articles_router, prefix="/api/articles", tags=["articles"])
 app.include_router(generator_router, prefix="/api/generate", tags=["generator"])
+app.include_router(status_router, prefix="/api/status", tags=["status"])
 
 
 def setup_httpx_logging():
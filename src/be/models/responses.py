@@ -1,4 +1,6 @@
-from typing import List, Optional
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
@@ -22,6 +24,57 @@ class Article(BaseModel):
     seoSlug: str
     url: str
     data: ArticleData
+    # "generating" while paragraphs are still being added
+    status: str = "ready"
+
+
+class ArticleTeaser(BaseModel):
+    publicId: str
+    title: Optional[str]
+    imageUrl: Optional[str]
+    url: str
+
+
+class ArticlePage(BaseModel):
+    articles: List[Article]
+    nextCursor: Optional[str]
+
+
+class ExportedArticle(BaseModel):
+    """One export line; the field names match requests.ArticleData so it can be re-imported."""
+
+    publicId: str
+    lang: str
+    title: Optional[str]
+    intro: Optional[str]
+    paragraphs: List[str]
+    keywords: List[str]
+    imagePrompt: Optional[str]
+    social: Optional[str]
+    imageUrl: Optional[str]
+    published: Optional[datetime]
+
+
+class ImportFailure(BaseModel):
+    index: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    imported: int = 0
+    shortIds: List[str] = []
+    failed: List[ImportFailure] = []
+
+
+class GenerationJob(BaseModel):
+    id: uuid.UUID
+    topic: str
+    status: str
+    shortId: str
+    languages: Dict[str, str]
+    error: Optional[str]
+    created: Optional[datetime]
+    updated: Optional[datetime]
 
 
 class OAIArticleResponse(BaseModel):
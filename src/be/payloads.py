@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+try:
+    import brotli
+except ImportError:  # optional; without it clients get gzip
+    brotli = None
+
+# below this size the encoded body is not worth the extra header bytes and CPU
+MIN_COMPRESS_SIZE = 512
+
+MEDIA_TYPE = "application/json"
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered by pydantic-core instead of `json.dumps`.
+
+    Used as the routers' default response class. Returning `FastJSONResponse(model)` from an
+    endpoint also skips FastAPI's response_model re-validation of already-typed models;
+    pydantic models, lists of them, datetimes and UUIDs are serialized in one native pass.
+    """
+
+    media_type = MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def _accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+class Payload:
+    """
+    A response body serialized once, with its ETag and compressed variants.
+
+    The ETag is a hash of the identity body, so it changes exactly when the content does.
+    Each encoding gets its own strong tag (`"<hash>-gzip"`), as the bytes differ, and
+    `If-None-Match` matches any of them.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.encoded: Dict[str, bytes] = {}
+
+        if len(body) >= MIN_COMPRESS_SIZE:
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body)
+            # mtime=0 keeps the gzip bytes identical across workers and restarts
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+
+    @classmethod
+    def of(cls, model: BaseModel) -> "Payload":
+        return cls(model.model_dump_json().encode("utf-8"))
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            # a weak comparison is what If-None-Match asks for
+            tag = tag.removeprefix("W/").strip('"')
+            if tag.split("-", 1)[0] == self.digest:
+                return True
+        return False
+
+    def _encoding_for(self, accept_encoding: Optional[str]) -> Optional[str]:
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in self.encoded:  # br first when available
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+                return encoding
+        return None
+
+    def response(self, request: Request) -> Response:
+        encoding = self._encoding_for(request.headers.get("accept-encoding"))
+        headers = {"ETag": self.etag(encoding), "Vary": "Accept-Encoding"}
+
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is None:
+            return Response(self.body, media_type=MEDIA_TYPE, headers=headers)
+
+        headers["Content-Encoding"] = encoding
+        return Response(self.encoded[encoding], media_type=MEDIA_TYPE, headers=headers)
@@ -1,104 +1,242 @@
+import base64
+import uuid
 from datetime import datetime
 from http import HTTPStatus
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import models.responses as responses
-from db.models import Article, Language, ArticleKeyword, Keyword
-from db.dependencies import get_db
+from cache import response_cache
+from db.languages import language_registry
+from db.models import Article, ArticleKeyword, Keyword
+from db.dependencies import AsyncSessionLocal, get_db
+from db.documents import load_missing_documents, teaser
+from db.exporter import export_articles
+from db.related import RELATED_MAX, related_index
+from db.trending import TRENDING_CAPACITY, trending_tracker
+from db.visits import visit_counter
+from payloads import FastJSONResponse, Payload
+
+HOMEPAGE_PAGE_SIZE = 20
+HOMEPAGE_MAX_PAGE_SIZE = 100
+TRENDING_PAGE_SIZE = 10
+RELATED_PAGE_SIZE = 5
+
+articles_router = APIRouter(default_response_class=FastJSONResponse)
+
+
+def _to_response(article: Article, lang: str) -> responses.Article:
+    d = responses.ArticleData(
+        title=article.document["title"],
+        perex="",
+        keywords=article.document["keywords"],
+        paragraphs=article.document["paragraphs"],
+    )
+    return responses.Article(
+        publicId=article.short_id,
+        imageUrl=article.image_url,
+        lang=lang,
+        seoSlug=article.seo_slug,
+        url=f"/{lang}/{article.short_id}/{article.seo_slug}",
+        data=d,
+        status=article.status or "ready",
+    )
+
+
+def _language_id(lang: str) -> uuid.UUID:
+    language_id = language_registry.id_for(lang)
+    if language_id is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Language not found")
+    return language_id
+
+
+def _encode_cursor(article: Article) -> str:
+    raw = f"{article.published.isoformat()}|{article.id.hex}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        published, article_id = raw.split("|")
+        return datetime.fromisoformat(published), uuid.UUID(hex=article_id)
+    except Exception:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="Invalid cursor")
+
+
+async def _paginate(
+    db: AsyncSession, query, cursor: Optional[str], limit: int
+) -> Tuple[List[Article], Optional[str]]:
+    """Keyset pagination over (published, id), newest first."""
+    query = query.where(Article.published.isnot(None))
+
+    if cursor is not None:
+        published, article_id = _decode_cursor(cursor)
+        query = query.where(tuple_(Article.published, Article.id) < (published, article_id))
+
+    # one extra row tells us whether there is a next page
+    query = query.order_by(Article.published.desc(), Article.id.desc()).limit(limit + 1)
+    articles = (await db.execute(query)).scalars().all()
+    next_cursor = _encode_cursor(articles[limit - 1]) if len(articles) > limit else None
 
-articles_router = APIRouter()
+    return articles[:limit], next_cursor
+
+
+def _filter_by_keyword(query, keyword: str):
+    """Restrict an article query to one keyword, given either its id or its text."""
+    query = query.join(ArticleKeyword, ArticleKeyword.article_id == Article.id)
+
+    try:
+        return query.where(ArticleKeyword.keyword_id == uuid.UUID(keyword))
+    except ValueError:
+        return query.join(Keyword, Keyword.id == ArticleKeyword.keyword_id).where(
+            Keyword.keyword == keyword
+        )
 
 
-@articles_router.get("/homepage", response_model=List[responses.Article])
+@articles_router.get("/homepage", response_model=responses.ArticlePage)
 async def get_homepage(
-    lang: str = "en", keyword: Optional[str] = None, db: Session = Depends(get_db)
+    request: Request,
+    lang: str = "en",
+    keyword: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=HOMEPAGE_PAGE_SIZE, ge=1, le=HOMEPAGE_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
 ):
-    language_id = db.query(Language).filter_by(code=lang).first().id
-    result = []
+    key = ("homepage", lang, keyword, cursor, limit)
+    payload = response_cache.get(key)
+    if payload is not None:
+        return payload.response(request)
 
-    if keyword is None:
-        articles = db.query(Article).filter_by(lang_id=language_id).all()
+    language_id = _language_id(lang)
 
-        for article in articles:
-            keywords_ids = db.query(ArticleKeyword).filter_by(article_id=article.id).all()
+    # drafts are only readable by their public id
+    query = select(Article).filter_by(lang_id=language_id, status="ready")
 
-            keywords = (
-                db.query(Keyword)
-                .filter(Keyword.id.in_([keyword.keyword_id for keyword in keywords_ids]))
-                .all()
-            )
+    if keyword is not None:
+        query = _filter_by_keyword(query, keyword)
 
-            d = responses.ArticleData(
-                title=article.title,
-                perex="",
-                keywords=[keyword.keyword for keyword in keywords],
-                paragraphs=[paragraph.content for paragraph in article.paragraphs],
-            )
-            a = responses.Article(
-                publicId=article.short_id,
-                imageUrl=article.image_url,
-                lang=lang,
-                seoSlug=article.seo_slug,
-                url=f"/{lang}/{article.short_id}/{article.seo_slug}",
-                data=d,
-            )
+    articles, next_cursor = await _paginate(db, query, cursor, limit)
+    await load_missing_documents(db, articles)
 
-            result.append(a)
+    page = responses.ArticlePage(
+        articles=[_to_response(article, lang) for article in articles],
+        nextCursor=next_cursor,
+    )
+    payload = Payload.of(page)
+    response_cache.set(key, payload)
 
-        return result
+    return payload.response(request)
 
-    keyword_articles = db.query(ArticleKeyword).filter(ArticleKeyword.keyword_id == keyword).all()
-    articles = []
 
-    for keyword_article in keyword_articles:
-        article = db.query(Article).filter(Article.id == keyword_article.article_id).first()
-        articles.append(article)
+@articles_router.get("/keywords", response_model=List[responses.Keyword])
+async def get_keywords(lang: str = "en", db: AsyncSession = Depends(get_db)):
+    key = ("keywords", lang)
+    keywords = response_cache.get(key)
+    if keywords is not None:
+        return FastJSONResponse(keywords)
 
-    return result
+    language_id = _language_id(lang)
 
+    rows = await db.execute(select(Keyword).where(Keyword.lang_id == language_id))
+    keywords = [
+        responses.Keyword(key=keyword.keyword, label=keyword.label or keyword.keyword)
+        for keyword in rows.scalars()
+    ]
+    response_cache.set(key, keywords)
 
-@articles_router.get("/{public_id}", response_model=responses.Article)
-async def get_article(public_id: str, lang: str = "en", db: Session = Depends(get_db)):
+    # already typed; returning a response skips FastAPI's re-validation of the list
+    return FastJSONResponse(keywords)
+
+
+@articles_router.get("/trending", response_model=List[responses.ArticleTeaser])
+async def get_trending(
+    lang: str = "en",
+    limit: int = Query(default=TRENDING_PAGE_SIZE, ge=1, le=TRENDING_CAPACITY),
+):
+    """Most read articles of the language lately, from memory; no database access."""
+    return FastJSONResponse(trending_tracker.top(_language_id(lang), limit))
+
+
+@articles_router.get("/export")
+async def export_articles_ndjson(
+    lang: Optional[str] = None,
+    published_from: Optional[datetime] = None,
+    published_to: Optional[datetime] = None,
+):
+    """Stream articles as NDJSON; `published_to` is exclusive."""
+    lang_id = _language_id(lang) if lang is not None else None
+    lines = export_articles(AsyncSessionLocal, lang_id, published_from, published_to)
+
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+async def _get_article(short_id: str, lang: str, request: Request, db: AsyncSession) -> Response:
     try:
-        article = db.query(Article).filter_by(short_id=public_id).first()
-        article.visited += 1
-        article.last_visit = datetime.now()
-        db.commit()
+        key = ("article", short_id, lang)
+        cached = response_cache.get(key)
 
-        lang = db.query(Language).filter_by(id=article.lang_id).first().code
+        if cached is None:
+            # short_id is shared by all language variants of a generated article
+            query = select(Article).filter_by(short_id=short_id, lang_id=_language_id(lang))
+            article = (await db.execute(query)).scalars().first()
+            if article is None:
+                raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Article not found")
+            await load_missing_documents(db, [article])
 
-        keywords_ids = db.query(ArticleKeyword).filter_by(article_id=article.id).all()
+            payload = Payload.of(_to_response(article, lang))
+            if article.status == "generating":
+                # a draft changes with every paragraph: not cached, and previews are no visits
+                return payload.response(request)
 
-        keywords = (
-            db.query(Keyword)
-            .filter(Keyword.id.in_([keyword.keyword_id for keyword in keywords_ids]))
-            .all()
-        )
+            item = teaser(article, lang)
+            cached = (article.id, article.lang_id, item, payload)
+            response_cache.set(key, cached)
 
-        d = responses.ArticleData(
-            title=article.title,
-            perex="",
-            keywords=[keyword.keyword for keyword in keywords],
-            paragraphs=[paragraph.content for paragraph in article.paragraphs],
-        )
-        return responses.Article(
-            publicId=article.short_id,
-            imageUrl=article.image_url,
-            lang=lang,
-            seoSlug=article.seo_slug,
-            url=f"/{lang}/{article.short_id}/{article.seo_slug}",
-            data=d,
-        )
+        # a revalidated (304) read is still a visit
+        article_id, language_id, item, payload = cached
+        visit_counter.record(article_id)
+        trending_tracker.record(language_id, article_id, item)
+
+        return payload.response(request)
 
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Article not found")
 
 
-@articles_router.get("/keywords", response_model=List[responses.Keyword])
-async def get_keywords(lang: str = "en", db: Session = Depends(get_db)):
-    language_id = db.query(Language).filter(Language.code == lang).first().id
+@articles_router.get("/{public_id}", response_model=responses.Article)
+async def get_article(
+    public_id: str, request: Request, lang: str = "en", db: AsyncSession = Depends(get_db)
+):
+    return await _get_article(public_id, lang, request, db)
+
+
+@articles_router.get("/{public_id}/related", response_model=List[responses.ArticleTeaser])
+async def get_related(
+    public_id: str,
+    lang: str = "en",
+    limit: int = Query(default=RELATED_PAGE_SIZE, ge=1, le=RELATED_MAX),
+):
+    """Articles of the same language sharing the most keywords, from the in-memory index."""
+    related = related_index.related(_language_id(lang), public_id, limit)
+    if related is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Article not found")
+
+    return FastJSONResponse(related)
 
-    return db.query(Keyword).filter(Keyword.lang_id == language_id).all()
+
+@articles_router.get("/{lang}/{short_id}", response_model=responses.Article)
+@articles_router.get("/{lang}/{short_id}/{seo_slug}", response_model=responses.Article)
+async def get_article_by_url(
+    lang: str,
+    short_id: str,
+    request: Request,
+    seo_slug: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Matches the `url` of responses.Article; the slug is cosmetic and not checked."""
+    return await _get_article(short_id, lang, request, db)
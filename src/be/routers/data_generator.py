@@ -1,59 +1,75 @@
-import datetime
 from typing import List
 
 from db import dependencies
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 
-import db.models as models
 import models.requests as requests
+import models.responses as responses
 
-from db.database import insert_keyword
+from cache import response_cache
+from db.importer import IMPORT_CHUNK_SIZE, import_articles, iter_records
+from db.ingest import ingest_article, upsert_keywords
+from db.languages import language_registry
+from db.related import related_index
 from logger_config import logger
+from payloads import FastJSONResponse
 
-generator_router = APIRouter()
+generator_router = APIRouter(default_response_class=FastJSONResponse)
 
 
 @generator_router.post("/article")
 async def create_article(request: requests.ArticleData, db=Depends(dependencies.get_db)):
     try:
-        lang_id = db.query(models.Language).filter(models.Language.code == request.lang).first().id
+        lang_id = language_registry.id_for(request.lang)
+        if lang_id is None:
+            raise ValueError(f"Unknown language: {request.lang}")
 
-        article = models.Article(
-            lang_id=lang_id, title=request.title, image_prompt=request.imagePrompt
-        )
-        article.published = datetime.datetime.now()
+        # one transaction and four statements, however many paragraphs and keywords
+        article = await ingest_article(db, request, lang_id)
+        await db.commit()
 
-        db.add(article)
-        db.commit()
+        response_cache.invalidate()
+        related_index.add(article)
 
-        for keyword in request.keywords:
-            k = db.query(models.Keyword.id).filter_by(keyword=keyword).first()
+        return {"response": article.short_id}
 
-            if not k:
-                k = models.Keyword(keyword=keyword, lang_id=lang_id)
-                db.add(k)
-                db.commit()
+    except Exception as e:
+        logger.error(e)
 
-            db.add(models.ArticleKeyword(keyword_id=k.id, article_id=article.id))
-            db.commit()
 
-        for idx, paragraph in enumerate(request.paragraphs):
-            db.add(models.Paragraph(content=paragraph, order=idx, article_id=article.id))
-            db.commit()
+@generator_router.post("/article/batch", response_model=responses.ImportReport)
+async def create_articles_batch(
+    request: Request, chunk_size: int = Query(default=IMPORT_CHUNK_SIZE, ge=1, le=5000)
+):
+    """
+    Import a JSON array, or NDJSON (Content-Type: application/x-ndjson), of ArticleData.
 
-        return {"response": article.short_id}
+    The body is parsed as it streams in; invalid records are reported by their index and
+    do not abort the rest of the batch.
+    """
+    records = iter_records(request.stream(), request.headers.get("content-type", ""))
+    report = await import_articles(dependencies.AsyncSessionLocal, records, chunk_size)
 
-    except Exception as e:
-        logger.error(e)
+    if report.imported:
+        response_cache.invalidate()
+
+    return report
 
 
 @generator_router.post("/keyword")
-async def create_keyword(request: List[str], db=Depends(dependencies.get_db)):
+async def create_keyword(request: List[str], lang: str = "cs", db=Depends(dependencies.get_db)):
     try:
-        for keyword in request:
-            response = insert_keyword(keyword=keyword, lang="cs")
+        lang_id = language_registry.id_for(lang)
+        if lang_id is None:
+            raise ValueError(f"Unknown language: {lang}")
+
+        # duplicates are folded in memory and existing keywords are returned, not re-inserted
+        keyword_ids = await upsert_keywords(db, request, lang_id)
+        await db.commit()
+
+        response_cache.invalidate()
 
-        return {"response": response.id}
+        return {"response": [keyword_ids[keyword] for keyword in dict.fromkeys(request) if keyword]}
     except Exception as e:
         logger.error(e)
 
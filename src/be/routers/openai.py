@@ -1,8 +1,10 @@
+import asyncio
 from http import HTTPStatus
 import os
+import uuid
 from loguru import logger
+from ai.jobs import job_queue
 from ai.openai_assistant import (
-    command,
     create_assistant,
     generate_image,
     list_assistants,
@@ -11,21 +13,26 @@ from ai.openai_assistant import (
 )
 import openai
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
+import models.responses as responses
+from db.dependencies import get_db
+from db.models import GenerationJob
 from models.requests import PromptRequest
+from payloads import FastJSONResponse
 import sys
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 logger.add(sys.stderr, format="{time} {level} {message}", filter="openai_router", level="INFO")
-openai_router = APIRouter()
+openai_router = APIRouter(default_response_class=FastJSONResponse)
 
 
 @openai_router.get("/assistant/list")
 async def get_list_assistants():
     try:
-        assistants = list_assistants()
-        return assistants
+        assistants = await list_assistants()
+        return {"data": assistants}
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -33,7 +40,7 @@ async def get_list_assistants():
 @openai_router.get("/assistant/last")
 async def get_last_assistants():
     try:
-        response = retrieve_assistant()
+        response = await retrieve_assistant()
         return response
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
@@ -42,29 +49,48 @@ async def get_last_assistants():
 @openai_router.post("/assistant/create")
 async def post_create_assistant():
     try:
-        response = create_assistant()
+        response = await create_assistant()
 
         return {"response": response}
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
 
 
-@openai_router.post("/command")
-async def post_command(request: PromptRequest):
+@openai_router.post("/command", status_code=HTTPStatus.ACCEPTED)
+async def post_command(request: PromptRequest, db: AsyncSession = Depends(get_db)):
+    """Queue the generation; poll GET /command/{job_id} for its progress."""
     try:
         logger.info(f"Command: {request.topic}")
-        response = command(topic=request.topic)
-        logger.info(f"Command finished. Response: {response}")
+        job = await job_queue.submit(db, request.topic)
+        logger.info(f"Command queued as job {job.id}")
 
-        return {"response": response}
+        return {"response": str(job.id), "shortId": job.short_id}
     except Exception as e:
         raise HTTPException(status_code=HTTPStatus.INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@openai_router.get("/command/{job_id}", response_model=responses.GenerationJob)
+async def get_command(job_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    job = await db.get(GenerationJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="Job not found")
+
+    return responses.GenerationJob(
+        id=job.id,
+        topic=job.topic,
+        status=job.status,
+        shortId=job.short_id,
+        languages=job.languages or {},
+        error=job.error,
+        created=job.created,
+        updated=job.updated,
+    )
+
+
 @openai_router.post("/image/generate")
 async def post_image_generate(request: PromptRequest):
     try:
-        response = generate_image(prompt=request.topic, client=None, short_id="dummy_image")
+        response = await generate_image(prompt=request.topic, short_id="dummy_image")
 
         return {"response": response}
     except Exception as e:
@@ -74,7 +100,7 @@ async def post_image_generate(request: PromptRequest):
 @openai_router.post("/image/upload")
 async def upload_image(request: str):
     try:
-        response = upload_file_to_s3(request)
+        response = await asyncio.to_thread(upload_file_to_s3, request)
 
         return {"response": response}
     except Exception as e:
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ai.assistants import assistant_registry
+from cache import response_cache
+from db.dependencies import get_db
+from db.languages import language_registry
+from db.pool import async_pool_monitor
+from payloads import FastJSONResponse
+
+status_router = APIRouter(default_response_class=FastJSONResponse)
+
+
+@status_router.get("/cache")
+async def get_cache_stats():
+    return response_cache.stats()
+
+
+@status_router.get("/pool")
+async def get_pool_stats():
+    # the blocking engine used at startup does not pool its connections
+    return {"async": async_pool_monitor.stats()}
+
+
+@status_router.post("/languages/refresh")
+async def post_refresh_languages(db: AsyncSession = Depends(get_db)):
+    await language_registry.refresh(db)
+    return {"languages": len(language_registry)}
+
+
+@status_router.post("/assistants/refresh")
+async def post_refresh_assistants(db: AsyncSession = Depends(get_db)):
+    # the cloud listing is synced again on its next use
+    assistant_registry.invalidate()
+    await assistant_registry.refresh(db)
+    return {"assistants": len(assistant_registry)}
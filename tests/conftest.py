@@ -0,0 +1,9 @@
+import os
+
+# db.database builds its engine at import time, so it needs a parseable URL even though
+# the tests never talk to Postgres.
+os.environ.setdefault("AI_ART_DB_USER", "postgres")
+os.environ.setdefault("AI_ART_DB_PASSWORD", "postgres")
+os.environ.setdefault("AI_ART_DB_HOST", "localhost")
+os.environ.setdefault("AI_ART_DB_PORT", "5432")
+os.environ.setdefault("AI_ART_DB_NAME", "ai_articles_test")
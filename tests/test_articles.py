@@ -0,0 +1,470 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from ai.drafts import ArticleDraft
+from cache import response_cache
+from db.dependencies import get_db
+from db.documents import backfill_documents, build_document
+from db.exporter import export_articles
+from db.languages import language_registry
+from db.related import related_index
+from db.models import Article, ArticleKeyword, Base, Keyword, Language, Paragraph
+from db.visits import visit_counter
+from routers.articles import articles_router
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def engine(database_url):
+    # NullPool: the app and the test body run their coroutines on different event loops
+    engine = create_async_engine(
+        database_url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool
+    )
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def async_session_factory(engine):
+    return async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+def session_factory(database_url):
+    """Blocking sessions for seeding and inspecting the database from the tests."""
+    engine = create_engine(database_url)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(async_session_factory):
+    app = FastAPI()
+    app.include_router(articles_router, prefix="/api/articles")
+
+    async def override_get_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.invalidate()
+    visit_counter._drain()
+    return TestClient(app)
+
+
+def seed_articles(session_factory, count: int):
+    with session_factory() as db:
+        language = db.query(Language).filter_by(code="en").first()
+        if language is None:
+            language = Language(code="en", name="English")
+            db.add(language)
+            db.flush()
+
+        offset = db.query(Article).count()
+        for i in range(offset, offset + count):
+            article = Article(short_id=f"a{i:07d}", title=f"Article {i}", lang_id=language.id)
+            db.add(article)
+            db.flush()
+
+            for order in range(3):
+                db.add(Paragraph(content=f"{i}-{order}", order=order, article_id=article.id))
+
+            for k in range(2):
+                keyword = Keyword(keyword=f"kw-{i}-{k}", lang_id=language.id)
+                db.add(keyword)
+                db.flush()
+                db.add(ArticleKeyword(article_id=article.id, keyword_id=keyword.id))
+
+        db.commit()
+        language_registry.load(db)
+
+
+def count_queries(engine, fn):
+    engine = engine.sync_engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return result, len(statements)
+
+
+def test_homepage_query_count_does_not_depend_on_article_count(engine, session_factory, client):
+    url = "/api/articles/homepage?limit=100"
+
+    seed_articles(session_factory, 5)
+    response, small = count_queries(engine, lambda: client.get(url))
+    assert response.status_code == 200
+    assert len(response.json()["articles"]) == 5
+
+    seed_articles(session_factory, 45)
+    response_cache.invalidate()
+    response, large = count_queries(engine, lambda: client.get(url))
+    assert response.status_code == 200
+    assert len(response.json()["articles"]) == 50
+
+    assert small == large
+    assert large <= 4
+
+
+def test_homepage_returns_ordered_paragraphs_and_keywords(session_factory, client):
+    seed_articles(session_factory, 1)
+
+    article = client.get("/api/articles/homepage").json()["articles"][0]
+
+    assert article["data"]["paragraphs"] == ["0-0", "0-1", "0-2"]
+    assert sorted(article["data"]["keywords"]) == ["kw-0-0", "kw-0-1"]
+
+
+def test_homepage_keyset_pagination(session_factory, client):
+    seed_articles(session_factory, 25)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 10}
+        if cursor is not None:
+            params["cursor"] = cursor
+        page = client.get("/api/articles/homepage", params=params).json()
+        seen.extend(article["publicId"] for article in page["articles"])
+        pages += 1
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+
+    assert pages == 3
+    # newest first, every article exactly once
+    assert seen == [f"a{i:07d}" for i in reversed(range(25))]
+
+
+def test_homepage_rejects_invalid_cursor_and_oversized_pages(session_factory, client):
+    seed_articles(session_factory, 1)
+
+    assert client.get("/api/articles/homepage", params={"cursor": "nope"}).status_code == 400
+    assert client.get("/api/articles/homepage", params={"limit": 1000}).status_code == 422
+
+
+def test_homepage_filters_by_keyword_text_or_id(engine, session_factory, client):
+    seed_articles(session_factory, 30)
+    response_cache.invalidate()
+    with session_factory() as db:
+        keyword_id = db.query(Keyword).filter_by(keyword="kw-7-1").first().id
+
+    for value in ("kw-7-1", str(keyword_id)):
+        response, queries = count_queries(
+            engine, lambda: client.get("/api/articles/homepage", params={"keyword": value})
+        )
+        articles = response.json()["articles"]
+
+        assert [article["publicId"] for article in articles] == ["a0000007"]
+        assert queries <= 4
+
+    assert client.get("/api/articles/homepage?keyword=missing").json()["articles"] == []
+
+
+def test_repeated_reads_are_served_from_cache(
+    engine, session_factory, async_session_factory, client
+):
+    seed_articles(session_factory, 3)
+    client.get("/api/articles/homepage")
+    client.get("/api/articles/a0000001")
+
+    response, queries = count_queries(engine, lambda: client.get("/api/articles/homepage"))
+    assert response.status_code == 200
+    assert queries == 0
+
+    # the visit is still counted on a cache hit, without touching the database
+    response, queries = count_queries(engine, lambda: client.get("/api/articles/a0000001"))
+    assert response.json()["publicId"] == "a0000001"
+    assert queries == 0
+
+    assert asyncio.run(visit_counter.flush(async_session_factory)) == 1
+    with session_factory() as db:
+        assert db.query(Article).filter_by(short_id="a0000001").first().visited == 2
+
+
+def test_keywords_route_is_not_shadowed_by_article_route(session_factory, client):
+    seed_articles(session_factory, 1)
+
+    keywords = client.get("/api/articles/keywords").json()
+
+    assert sorted(keyword["key"] for keyword in keywords) == ["kw-0-0", "kw-0-1"]
+
+
+def test_failed_visit_flush_keeps_pending_counts(session_factory, async_session_factory, client):
+    seed_articles(session_factory, 1)
+    client.get("/api/articles/a0000000")
+
+    def broken_session():
+        raise RuntimeError("database unavailable")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(visit_counter.flush(broken_session))
+
+    client.get("/api/articles/a0000000")
+    assert asyncio.run(visit_counter.flush(async_session_factory)) == 1
+    with session_factory() as db:
+        assert db.query(Article).filter_by(short_id="a0000000").first().visited == 2
+
+
+def test_cancelled_visit_flush_keeps_pending_counts(
+    session_factory, async_session_factory, client
+):
+    seed_articles(session_factory, 1)
+    client.get("/api/articles/a0000000")
+
+    class StalledSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, *args):
+            await asyncio.sleep(60)
+
+    async def shutdown():
+        flusher = asyncio.create_task(visit_counter.flush(StalledSession))
+        await asyncio.sleep(0)
+        flusher.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flusher
+        return await visit_counter.flush(async_session_factory)
+
+    assert asyncio.run(shutdown()) == 1
+    with session_factory() as db:
+        assert db.query(Article).filter_by(short_id="a0000000").first().visited == 1
+
+
+def test_language_lookups_do_not_query_the_database(engine, session_factory, client):
+    seed_articles(session_factory, 2)
+
+    response, queries = count_queries(engine, lambda: client.get("/api/articles/a0000000"))
+    assert response.json()["lang"] == "en"
+    # the article and its two eager-loaded collections, no language lookup
+    assert queries == 3
+
+    assert client.get("/api/articles/homepage?lang=xx").status_code == 404
+
+
+def test_article_lookup_picks_the_requested_language_variant(engine, session_factory, client):
+    seed_articles(session_factory, 1)
+    with session_factory() as db:
+        german = Language(code="de", name="German")
+        db.add(german)
+        db.flush()
+        db.add(Article(short_id="a0000000", title="Artikel 0", lang_id=german.id))
+        db.commit()
+        language_registry.load(db)
+
+    assert client.get("/api/articles/a0000000").json()["data"]["title"] == "Article 0"
+
+    response, queries = count_queries(
+        engine, lambda: client.get("/api/articles/a0000000", params={"lang": "de"})
+    )
+    assert response.json()["data"]["title"] == "Artikel 0"
+    assert response.json()["url"] == "/de/a0000000/artikel-0"
+    assert queries == 3
+
+    assert client.get("/api/articles/de/a0000000/artikel-0").json()["lang"] == "de"
+    assert client.get("/api/articles/de/a0000000").json()["lang"] == "de"
+    assert client.get("/api/articles/a0000000", params={"lang": "cs"}).status_code == 404
+
+
+def test_export_streams_batches_with_constant_queries_per_batch(
+    engine, session_factory, async_session_factory
+):
+    seed_articles(session_factory, 10)
+
+    async def export(batch_size):
+        return [
+            chunk
+            async for chunk in export_articles(
+                async_session_factory, language_registry.id_for("en"), batch_size=batch_size
+            )
+        ]
+
+    chunks, statements = count_queries(engine, lambda: asyncio.run(export(4)))
+
+    # one cursor plus a paragraphs and a keywords query for each of the three batches
+    assert len(chunks) == 3
+    assert statements == 1 + 3 * 2
+
+    lines = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+    assert [line["title"] for line in lines] == [f"Article {i}" for i in range(10)]
+    assert lines[0]["paragraphs"] == ["0-0", "0-1", "0-2"]
+    assert sorted(lines[0]["keywords"]) == ["kw-0-0", "kw-0-1"]
+    assert lines[0]["lang"] == "en"
+
+
+def test_articles_with_documents_are_read_from_one_row(
+    engine, session_factory, async_session_factory, client
+):
+    seed_articles(session_factory, 3)
+    before = client.get("/api/articles/homepage").json()
+
+    total = asyncio.run(backfill_documents(async_session_factory, batch_size=2))
+    assert total == 3
+    response_cache.invalidate()
+
+    response, queries = count_queries(engine, lambda: client.get("/api/articles/homepage"))
+    assert response.json() == before
+    assert queries == 1
+
+    response, queries = count_queries(engine, lambda: client.get("/api/articles/a0000001"))
+    assert response.json()["data"]["paragraphs"] == ["1-0", "1-1", "1-2"]
+    assert queries == 1
+
+
+def test_revalidated_article_reads_return_304_and_count_visits(session_factory, client):
+    seed_articles(session_factory, 1)
+
+    response = client.get("/api/articles/a0000000")
+    etag = response.headers["etag"]
+
+    response = client.get("/api/articles/a0000000", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    (article_id,) = visit_counter._pending
+    assert visit_counter._pending[article_id][0] == 2
+
+    homepage = client.get("/api/articles/homepage")
+    response = client.get(
+        "/api/articles/homepage", headers={"If-None-Match": homepage.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_trending_is_fed_by_article_reads_and_served_from_memory(engine, session_factory, client):
+    seed_articles(session_factory, 3)
+
+    for short_id, reads in (("a0000000", 1), ("a0000001", 3), ("a0000002", 2)):
+        for _ in range(reads):
+            client.get(f"/api/articles/{short_id}")
+
+    response, queries = count_queries(engine, lambda: client.get("/api/articles/trending"))
+    assert [item["publicId"] for item in response.json()] == ["a0000001", "a0000002", "a0000000"]
+    assert response.json()[0]["url"] == "/en/a0000001/article-1"
+    assert queries == 0
+
+    assert client.get("/api/articles/trending?limit=1").json()[0]["publicId"] == "a0000001"
+
+
+def test_related_articles_are_served_from_the_loaded_index(
+    engine, session_factory, async_session_factory, client
+):
+    seed_articles(session_factory, 3)
+    with session_factory() as db:
+        # a second article on keyword kw-0-0, rendered from its document
+        language = db.query(Language).filter_by(code="en").one()
+        db.add(
+            Article(
+                short_id="b0000000",
+                title="Sibling",
+                lang_id=language.id,
+                document=build_document("Sibling", None, [], ["kw-0-0", "other"]),
+            )
+        )
+        db.commit()
+
+    asyncio.run(related_index.load(async_session_factory))
+
+    def related(short_id):
+        response = client.get(f"/api/articles/{short_id}/related", params={"lang": "en"})
+        return [item["publicId"] for item in response.json()]
+
+    assert related("a0000000") == ["b0000000"]
+    assert related("a0000001") == []
+    assert count_queries(engine, lambda: related("b0000000")) == (["a0000000"], 0)
+    assert client.get("/api/articles/zzzzzzzz/related").status_code == 404
+
+
+def test_related_index_picks_up_articles_written_by_another_worker(
+    session_factory, async_session_factory, client
+):
+    seed_articles(session_factory, 2)
+    asyncio.run(related_index.load(async_session_factory))
+
+    def related(short_id):
+        response = client.get(f"/api/articles/{short_id}/related", params={"lang": "en"})
+        return response.status_code, [item["publicId"] for item in response.json()]
+
+    # written and committed elsewhere, so this worker's index never saw its add()
+    with session_factory() as db:
+        language = db.query(Language).filter_by(code="en").one()
+        db.add(
+            Article(
+                short_id="c0000000",
+                title="Elsewhere",
+                lang_id=language.id,
+                document=build_document("Elsewhere", None, [], ["kw-1-0"]),
+            )
+        )
+        db.commit()
+
+    assert client.get("/api/articles/c0000000/related").status_code == 404
+
+    async def sync():
+        async with async_session_factory() as db:
+            return await related_index.sync(db)
+
+    assert asyncio.run(sync()) == 1
+    assert related("c0000000") == (200, ["a0000001"])
+    assert related("a0000001") == (200, ["c0000000"])
+    # already indexed articles inside the overlap window are not added again
+    assert asyncio.run(sync()) == 0
+
+
+def test_drafts_are_readable_while_written_and_kept_out_of_listings(
+    session_factory, async_session_factory, client
+):
+    seed_articles(session_factory, 1)
+    draft = ArticleDraft("d0000000", "thread_1", session_factory=async_session_factory)
+
+    async def feed(text):
+        await draft.feed("msg_1", text)
+
+    asyncio.run(feed('```json\n{"language": "en", "title": "Tides", "perex": "Moon"'))
+    asyncio.run(feed(', "paragraphs": ["One", "Tw'))
+
+    response = client.get("/api/articles/d0000000")
+    assert response.json()["status"] == "generating"
+    assert response.json()["data"]["paragraphs"] == ["One"]
+
+    asyncio.run(feed('o", "Thr'))
+    response = client.get("/api/articles/d0000000")
+    assert response.json()["data"]["paragraphs"] == ["One", "Two"]
+    assert not visit_counter._pending
+
+    homepage = client.get("/api/articles/homepage").json()["articles"]
+    assert [article["publicId"] for article in homepage] == ["a0000000"]
+    assert homepage[0]["status"] == "ready"
+
+    asyncio.run(draft.discard())
+    assert client.get("/api/articles/d0000000").status_code == 404
+    with session_factory() as db:
+        assert db.query(Paragraph).filter_by(content="One").count() == 0
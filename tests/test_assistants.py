@@ -0,0 +1,158 @@
+import asyncio
+import datetime
+import uuid
+
+import httpx
+from openai import AsyncOpenAI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ai.assistants import AssistantRegistry
+from db.models import Base, OpenAIAssistant
+
+
+def session_factory_for(tmp_path):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+def assistant_json(assistant_id):
+    return {
+        "id": assistant_id,
+        "object": "assistant",
+        "created_at": 0,
+        "model": "gpt-4o",
+        "tools": [],
+    }
+
+
+def fake_cloud(assistant_ids, page_size=2):
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request.url.path)
+        after = request.url.params.get("after")
+        start = assistant_ids.index(after) + 1 if after else 0
+        page = assistant_ids[start : start + page_size]
+        return httpx.Response(
+            200,
+            json={
+                "object": "list",
+                "data": [assistant_json(assistant_id) for assistant_id in page],
+                "has_more": start + page_size < len(assistant_ids),
+            },
+        )
+
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://assistants.test/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return client, requests
+
+
+def test_registry_maps_cloud_ids_and_knows_the_most_recent(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+    now = datetime.datetime.now()
+    older = OpenAIAssistant(id=uuid.uuid4(), assistant_id="asst_old", datetime_created=now)
+    newer = OpenAIAssistant(
+        id=uuid.uuid4(),
+        assistant_id="asst_new",
+        datetime_created=now + datetime.timedelta(minutes=1),
+    )
+
+    async def run():
+        async with session_factory() as db:
+            db.add_all([newer, older])
+            await db.commit()
+
+        registry = AssistantRegistry()
+        assert not registry.loaded
+        async with session_factory() as db:
+            await registry.refresh(db)
+
+        assert registry.loaded
+        assert len(registry) == 2
+        assert registry.current() == "asst_new"
+        assert registry.pk_for("asst_old") == older.id
+        assert registry.pk_for("asst_missing") is None
+
+        stored = OpenAIAssistant(id=uuid.uuid4(), assistant_id="asst_latest")
+        registry.remember(stored)
+        assert registry.current() == "asst_latest"
+        assert registry.pk_for("asst_latest") == stored.id
+
+        registry.invalidate()
+        assert not registry.loaded
+        assert registry.current() is None
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_cloud_listing_is_synced_once_and_served_from_the_cache():
+    client, requests = fake_cloud(["asst_1", "asst_2", "asst_3"])
+
+    async def run():
+        registry = AssistantRegistry()
+        assert registry.cloud() is None
+
+        await registry.sync_cloud(client)
+        # every page, up to the empty one after the last
+        pages = len(requests)
+        assert pages == 3
+        assert [assistant.id for assistant in registry.cloud()] == ["asst_1", "asst_2", "asst_3"]
+        assert registry.in_cloud("asst_2")
+        assert not registry.in_cloud("asst_9")
+        assert len(requests) == pages
+
+        # a newly created assistant drops the listing until the next sync
+        registry.remember(OpenAIAssistant(id=uuid.uuid4(), assistant_id="asst_4"))
+        assert registry.cloud() is None
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_concurrent_callers_share_one_cloud_listing():
+    client, requests = fake_cloud(["asst_1", "asst_2", "asst_3"])
+
+    async def run():
+        registry = AssistantRegistry()
+        await asyncio.gather(*(registry.sync_cloud(client) for _ in range(5)))
+        # one listing of two pages and the empty one after them
+        assert len(requests) == 3
+
+        await registry.sync_cloud(client, force=True)
+        assert len(requests) == 6
+        await client.close()
+
+    asyncio.run(run())
+
+
+def test_concurrent_generations_create_one_assistant(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+    created = []
+
+    async def create():
+        await asyncio.sleep(0.01)
+        assistant = OpenAIAssistant(id=uuid.uuid4(), assistant_id=f"asst_{len(created)}")
+        created.append(assistant)
+        return assistant
+
+    async def run():
+        registry = AssistantRegistry()
+        ids = await asyncio.gather(
+            *(registry.ensure_current(session_factory, create) for _ in range(3))
+        )
+        await engine.dispose()
+        return ids
+
+    assert asyncio.run(run()) == ["asst_0"] * 3
+    assert len(created) == 1
@@ -0,0 +1,65 @@
+import json
+
+from ai.drafts import ArticleStreamParser
+
+ARTICLE = {
+    "language": "en",
+    "title": "Tides",
+    "perex": 'The "moon" pulls',
+    "paragraphs": ["First, {braces} and [brackets].", "Second \\ with\na newline.", "Third"],
+    "keywords": ["moon", "sea"],
+    "image_prompt": "waves",
+    "twitter": "Tides!",
+}
+
+
+def parse(chunks):
+    parser = ArticleStreamParser()
+    return [part for chunk in chunks for part in parser.feed(chunk)]
+
+
+def test_fields_and_paragraphs_are_reported_as_they_close():
+    text = "```json\n" + json.dumps(ARTICLE, indent=2) + "\n```"
+    parts = parse([text])
+
+    assert [(part.kind, part.key) for part in parts] == [
+        ("field", "language"),
+        ("field", "title"),
+        ("field", "perex"),
+        ("paragraph", "paragraphs"),
+        ("paragraph", "paragraphs"),
+        ("paragraph", "paragraphs"),
+        ("field", "paragraphs"),
+        ("field", "keywords"),
+        ("field", "image_prompt"),
+        ("field", "twitter"),
+    ]
+    assert {part.key: part.value for part in parts if part.kind == "field"} == ARTICLE
+    assert [part.value for part in parts if part.kind == "paragraph"] == ARTICLE["paragraphs"]
+
+
+def test_output_split_anywhere_parses_the_same():
+    text = json.dumps(ARTICLE)
+    whole = parse([text])
+
+    for split in range(1, len(text)):
+        assert parse([text[:split], text[split:]]) == whole
+    assert parse(list(text)) == whole
+
+
+def test_a_paragraph_is_reported_before_the_next_one_is_written():
+    parser = ArticleStreamParser()
+    assert parser.feed('{"title": "Tides", "paragraphs": ["One", "Tw') == [
+        ("field", "title", "Tides"),
+        ("paragraph", "paragraphs", "One"),
+    ]
+    assert parser.feed('o"') == [("paragraph", "paragraphs", "Two")]
+
+
+def test_scalars_other_than_strings_are_decoded():
+    assert parse(['{"a": 1, "b": true, "c": null', ', "d": 2.5}']) == [
+        ("field", "a", 1),
+        ("field", "b", True),
+        ("field", "c", None),
+        ("field", "d", 2.5),
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from db.importer import RecordError, iter_json_array, iter_ndjson
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def async_iter(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(records):
+    async def run():
+        return [record async for record in records]
+
+    return asyncio.run(run())
+
+
+def test_json_array_is_decoded_across_chunk_boundaries():
+    items = [{"title": f"article {i}", "paragraphs": ["a, b", "[c]"]} for i in range(20)]
+    data = json.dumps(items, indent=2).encode()
+
+    for size in (1, 7, 64, len(data)):
+        assert collect(iter_json_array(chunked(data, size))) == items
+
+
+def test_json_array_is_decoded_across_split_characters():
+    items = [{"title": "Příliš žluťoučký kůň", "paragraphs": ["Größe", "úpěl ďábelské ódy"]}]
+    data = json.dumps(items, ensure_ascii=False).encode()
+
+    # every size below 4 splits some two-byte character
+    for size in (1, 2, 3, 5, 7):
+        assert collect(iter_json_array(chunked(data, size))) == items
+
+
+def test_invalid_utf8_ends_the_json_array_with_an_error():
+    records = collect(iter_json_array(chunked(b'[{"a": 1}, {"b": "\xff"}]', 4)))
+
+    assert isinstance(records[-1], RecordError)
+
+
+def test_numbers_split_across_chunks_are_decoded_whole():
+    for size in (1, 2, 3):
+        assert collect(iter_json_array(chunked(b"[12, -3.5e2, 0]", size))) == [12, -350.0, 0]
+
+    records = collect(iter_json_array(async_iter([b"[1", b"2, 3]"])))
+    assert records == [12, 3]
+
+
+def test_json_array_syntax_errors_end_the_stream_at_once():
+    read = []
+
+    async def body():
+        yield b'[{"a": 1}, {"b" 2}, '
+        for i in range(1000):
+            read.append(i)
+            yield b'{"c": 3}, '
+        yield b"]"
+
+    records = collect(iter_json_array(body()))
+
+    assert records[0] == {"a": 1}
+    assert isinstance(records[1], RecordError)
+    assert len(records) == 2
+    assert read == []
+
+
+def test_json_array_elements_must_be_separated_by_commas():
+    for data in (b'[{"a": 1} {"b": 2}]', b"[1 2]", b"[1,]", b"[1.2.3]"):
+        records = collect(iter_json_array(chunked(data, 3)))
+        assert isinstance(records[-1], RecordError), data
+        assert all(record in ({"a": 1}, 1) for record in records[:-1]), data
+
+
+def test_truncated_json_array_ends_with_an_error():
+    records = collect(iter_json_array(chunked(b'[{"a": 1}, {"b": ', 4)))
+
+    assert records[0] == {"a": 1}
+    assert isinstance(records[-1], RecordError)
+
+
+def test_ndjson_reports_bad_lines_and_keeps_going():
+    data = b'{"a": 1}\n\nnot json\n{"b": 2}'
+
+    records = collect(iter_ndjson(chunked(data, 3)))
+
+    assert records[0] == {"a": 1}
+    assert isinstance(records[1], RecordError)
+    assert records[2] == {"b": 2}
@@ -0,0 +1,219 @@
+import asyncio
+import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ai.jobs import JobQueue
+from db.models import Article, Base, GenerationJob, Paragraph
+
+
+def session_factory_for(tmp_path):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False)
+
+
+async def wait_for_status(session_factory, job_id, *statuses):
+    for _ in range(200):
+        async with session_factory() as db:
+            job = await db.get(GenerationJob, job_id)
+            if job.status in statuses:
+                return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stayed {job.status}")
+
+
+async def stop(workers, engine):
+    # let the cancelled loops leave their sessions before the engine goes away
+    workers.cancel()
+    await asyncio.gather(workers, return_exceptions=True)
+    await engine.dispose()
+    # a connection closed under a cancelled statement finishes closing in a task of its own
+    pending = asyncio.all_tasks() - {asyncio.current_task()}
+    if pending:
+        await asyncio.wait(pending, timeout=5)
+
+
+def test_jobs_run_in_the_background_and_report_progress(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+    started = []
+
+    async def runner(topic, short_id, on_progress, languages):
+        started.append((topic, short_id))
+        await on_progress("english", "running")
+        await on_progress("english", "done")
+        await on_progress("czech", "failed")
+
+    async def run():
+        queue = JobQueue(workers=2, poll_interval=60, runner=runner)
+        workers = asyncio.create_task(queue.run(session_factory))
+
+        async with session_factory() as db:
+            job = await queue.submit(db, "tides")
+        assert job.status == "queued"
+
+        finished = await wait_for_status(session_factory, job.id, "done", "failed")
+        await stop(workers, engine)
+        return job, finished
+
+    job, finished = asyncio.run(run())
+
+    assert started == [("tides", job.short_id)]
+    assert finished.languages == {"czech": "failed", "english": "done", "german": "queued"}
+    assert finished.status == "failed"
+
+
+def test_a_failing_job_does_not_stop_the_queue(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+
+    async def runner(topic, short_id, on_progress, languages):
+        if topic == "bad":
+            raise RuntimeError("boom")
+
+    async def run():
+        queue = JobQueue(workers=1, poll_interval=60, runner=runner)
+        async with session_factory() as db:
+            bad = await queue.submit(db, "bad")
+            good = await queue.submit(db, "good")
+
+        workers = asyncio.create_task(queue.run(session_factory))
+        bad = await wait_for_status(session_factory, bad.id, "done", "failed")
+        good = await wait_for_status(session_factory, good.id, "done", "failed")
+        await stop(workers, engine)
+        return bad, good
+
+    bad, good = asyncio.run(run())
+
+    assert (bad.status, bad.error) == ("failed", "boom")
+    assert good.status == "done"
+
+
+def test_jobs_run_concurrently_on_the_event_loop(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+    running = 0
+    overlap = 0
+
+    async def runner(topic, short_id, on_progress, languages):
+        nonlocal running, overlap
+        running += 1
+        overlap = max(overlap, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+
+    async def run():
+        queue = JobQueue(workers=2, poll_interval=60, runner=runner)
+        async with session_factory() as db:
+            jobs = [await queue.submit(db, topic) for topic in ("tides", "dunes")]
+
+        workers = asyncio.create_task(queue.run(session_factory))
+        for job in jobs:
+            await wait_for_status(session_factory, job.id, "done", "failed")
+        await stop(workers, engine)
+
+    asyncio.run(run())
+
+    assert overlap == 2
+
+
+def test_a_job_cancelled_at_shutdown_is_queued_again(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+    started = asyncio.Event()
+
+    async def runner(topic, short_id, on_progress, languages):
+        await on_progress("english", "done")
+        await on_progress("czech", "running")
+        started.set()
+        await asyncio.sleep(60)
+
+    async def run():
+        queue = JobQueue(workers=1, poll_interval=60, runner=runner)
+        async with session_factory() as db:
+            job = await queue.submit(db, "tides")
+
+        workers = asyncio.create_task(queue.run(session_factory))
+        await started.wait()
+        await stop(workers, engine)
+
+        async with session_factory() as db:
+            requeued = await db.get(GenerationJob, job.id)
+        await engine.dispose()
+        return requeued
+
+    requeued = asyncio.run(run())
+
+    assert requeued.status == "queued"
+    assert requeued.languages == {"czech": "queued", "english": "done", "german": "queued"}
+
+
+def test_a_stale_running_job_is_claimed_for_its_unfinished_languages(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+    generated = []
+
+    async def runner(topic, short_id, on_progress, languages):
+        generated.extend(languages)
+        for lang in languages:
+            await on_progress(lang, "done")
+
+    async def run():
+        queue = JobQueue(workers=1, poll_interval=60, runner=runner, stale_after=600)
+        async with session_factory() as db:
+            stale = await queue.submit(db, "tides")
+            live = await queue.submit(db, "dunes")
+            # as left behind by a worker that died mid-run, and one still busy elsewhere
+            stale.status = live.status = "running"
+            stale.languages = {"czech": "running", "english": "done", "german": "queued"}
+            stale.updated = datetime.datetime.now() - datetime.timedelta(hours=1)
+            await db.commit()
+
+        workers = asyncio.create_task(queue.run(session_factory))
+        finished = await wait_for_status(session_factory, stale.id, "done", "failed")
+        await stop(workers, engine)
+
+        async with session_factory() as db:
+            untouched = await db.get(GenerationJob, live.id)
+        await engine.dispose()
+        return finished, untouched
+
+    finished, untouched = asyncio.run(run())
+
+    assert sorted(generated) == ["czech", "german"]
+    assert finished.status == "done"
+    assert untouched.status == "running"
+
+
+def test_drafts_of_an_interrupted_run_are_removed_before_the_job_runs_again(tmp_path):
+    engine, session_factory = session_factory_for(tmp_path)
+
+    async def runner(topic, short_id, on_progress, languages):
+        pass
+
+    async def run():
+        queue = JobQueue(workers=1, poll_interval=60, runner=runner)
+        async with session_factory() as db:
+            job = await queue.submit(db, "tides")
+            draft = Article(short_id=job.short_id, title="Half", status="generating")
+            done = Article(short_id=job.short_id, title="Whole", status="ready")
+            db.add_all([draft, done])
+            await db.flush()
+            db.add(Paragraph(content="first", order=0, article_id=draft.id))
+            await db.commit()
+
+        workers = asyncio.create_task(queue.run(session_factory))
+        await wait_for_status(session_factory, job.id, "done", "failed")
+        await stop(workers, engine)
+
+        async with session_factory() as db:
+            titles = (await db.execute(select(Article.title))).scalars().all()
+            paragraphs = (await db.execute(select(Paragraph))).scalars().all()
+        await engine.dispose()
+        return titles, paragraphs
+
+    titles, paragraphs = asyncio.run(run())
+
+    assert titles == ["Whole"]
+    assert paragraphs == []
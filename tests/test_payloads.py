@@ -0,0 +1,59 @@
+import gzip
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from payloads import MIN_COMPRESS_SIZE, Payload
+
+
+def payload_client(payload: Payload) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/")
+    async def read(request: Request):
+        return payload.response(request)
+
+    return TestClient(app)
+
+
+def test_etag_follows_content():
+    assert Payload(b'{"a": 1}').etag() == Payload(b'{"a": 1}').etag()
+    assert Payload(b'{"a": 1}').etag() != Payload(b'{"a": 2}').etag()
+
+
+def test_gzip_variant_is_served_when_accepted():
+    body = b'{"text": "%s"}' % (b"x" * MIN_COMPRESS_SIZE)
+    payload = Payload(body)
+    client = payload_client(payload)
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == payload.etag("gzip")
+    assert response.content == body
+    assert gzip.decompress(payload.encoded["gzip"]) == body
+
+    response = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == payload.etag()
+
+    response = client.get("/", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in response.headers
+
+
+def test_small_bodies_are_not_compressed():
+    payload = Payload(b"{}")
+
+    assert payload.encoded == {}
+    assert "content-encoding" not in payload_client(payload).get("/").headers
+
+
+def test_if_none_match_returns_not_modified():
+    payload = Payload(b'{"a": 1}')
+    client = payload_client(payload)
+
+    for tag in (payload.etag(), f"W/{payload.etag('gzip')}", '"other", ' + payload.etag(), "*"):
+        response = client.get("/", headers={"If-None-Match": tag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    assert client.get("/", headers={"If-None-Match": '"other"'}).status_code == 200
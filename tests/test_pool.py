@@ -0,0 +1,23 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from db.pool import PoolMonitor
+
+
+def test_pool_monitor_counts_checkouts_and_saturation(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, max_overflow=1
+    )
+    monitor = PoolMonitor(engine)
+
+    with engine.connect():
+        assert monitor.stats()["checked_out"] == 1
+        with engine.connect():
+            stats = monitor.stats()
+
+    assert stats["checked_out"] == 2
+    assert stats["overflow"] == 1
+    assert monitor.stats()["checkouts"] == 2
+    assert monitor.stats()["peak_checked_out"] == 2
+    assert monitor.stats()["saturated_checkouts"] == 1
+    engine.dispose()
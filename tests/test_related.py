@@ -0,0 +1,51 @@
+import uuid
+
+import models.responses as responses
+from db.related import RelatedIndex
+
+
+def add(index: RelatedIndex, language_id: uuid.UUID, short_id: str, keywords):
+    item = responses.ArticleTeaser(publicId=short_id, title=None, imageUrl=None, url="/")
+    index._add(uuid.uuid4(), language_id, short_id, keywords, item)
+
+
+def related(index: RelatedIndex, language_id: uuid.UUID, short_id: str, n: int = 10):
+    return [item.publicId for item in index.related(language_id, short_id, n)]
+
+
+def test_neighbours_are_ranked_by_jaccard_similarity():
+    index = RelatedIndex()
+    en = uuid.uuid4()
+    add(index, en, "base", ["a", "b", "c"])
+    add(index, en, "half", ["a", "b", "x", "y"])  # 2 / 5
+    add(index, en, "same", ["a", "b", "c"])  # 3 / 3
+    add(index, en, "one", ["c"])  # 1 / 3
+    add(index, en, "none", ["z"])
+
+    assert related(index, en, "base") == ["same", "half", "one"]
+    assert related(index, en, "base", 1) == ["same"]
+    assert index.related(en, "missing", 10) is None
+
+
+def test_neighbours_stay_within_the_language():
+    index = RelatedIndex()
+    en, de = uuid.uuid4(), uuid.uuid4()
+    add(index, en, "en-1", ["a"])
+    add(index, en, "en-2", ["a"])
+    add(index, de, "de-1", ["a"])
+
+    assert related(index, en, "en-1") == ["en-2"]
+    assert related(index, de, "de-1") == []
+
+
+def test_added_articles_invalidate_the_neighbours_they_join():
+    index = RelatedIndex(size=2)
+    en = uuid.uuid4()
+    add(index, en, "base", ["a", "b"])
+    add(index, en, "weak", ["a", "x", "y"])
+    assert related(index, en, "base") == ["weak"]
+
+    add(index, en, "strong", ["a", "b"])
+
+    assert related(index, en, "base") == ["strong", "weak"]
+    assert related(index, en, "weak") == ["base", "strong"]
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from openai.types.beta.threads import Message
+
+import ai.openai_assistant as openai_assistant
+from ai.openai_assistant import follow_run, poll_run, save_to_database
+
+
+def run_json(status):
+    return {
+        "id": "run_1",
+        "object": "thread.run",
+        "created_at": 0,
+        "thread_id": "thread_1",
+        "assistant_id": "asst_1",
+        "status": status,
+        "instructions": "",
+        "model": "gpt-4o",
+        "tools": [],
+        "parallel_tool_calls": True,
+    }
+
+
+def event_stream(*statuses, done=True):
+    events = [
+        f"event: thread.run.{status}\ndata: {json.dumps(run_json(status))}\n\n"
+        for status in statuses
+    ]
+    if done:
+        events.append("event: done\ndata: [DONE]\n\n")
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content="".join(events).encode()
+    )
+
+
+def fake_assistants(stream, polls, headers=None):
+    """A client whose runs stream `stream` and whose retrieves answer `polls` in turn."""
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append((request.method, request.url.path))
+        if request.method == "POST" and request.url.path.endswith("/runs"):
+            assert json.loads(request.content)["stream"] is True
+            return stream
+        if request.method == "GET" and "/runs/" in request.url.path:
+            return httpx.Response(200, headers=headers or {}, json=run_json(polls.pop(0)))
+        return httpx.Response(404, json={"error": {"message": request.url.path}})
+
+    client = AsyncOpenAI(
+        api_key="test",
+        base_url="http://assistants.test/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return client, requests
+
+
+def record_sleeps(monkeypatch):
+    sleeps = []
+    sleep = asyncio.sleep
+
+    async def recorded(delay):
+        sleeps.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(openai_assistant.asyncio, "sleep", recorded)
+    return sleeps
+
+
+def test_run_completion_arrives_on_the_event_stream(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    client, requests = fake_assistants(
+        event_stream("created", "queued", "in_progress", "completed"), polls=[]
+    )
+
+    run = asyncio.run(follow_run(client, "thread_1", "asst_1"))
+
+    assert run.status == "completed"
+    assert requests == [("POST", "/v1/threads/thread_1/runs")]
+    assert sleeps == []
+
+
+def test_broken_off_stream_falls_back_to_polling_at_the_server_hint(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    client, requests = fake_assistants(
+        event_stream("created", "in_progress", done=False),
+        polls=["in_progress", "in_progress", "completed"],
+        headers={"openai-poll-after-ms": "40"},
+    )
+
+    run = asyncio.run(follow_run(client, "thread_1", "asst_1"))
+
+    assert run.status == "completed"
+    assert requests.count(("GET", "/v1/threads/thread_1/runs/run_1")) == 3
+    assert sleeps == [0.04, 0.04]
+
+
+def test_polling_backs_off_without_a_hint(monkeypatch):
+    sleeps = record_sleeps(monkeypatch)
+    client, _ = fake_assistants(
+        event_stream(), polls=["queued"] + ["in_progress"] * 4 + ["failed"]
+    )
+
+    run = asyncio.run(poll_run(client, "thread_1", "run_1", initial=0.25, maximum=2))
+
+    assert run.status == "failed"
+    assert sleeps == [0.25, 0.5, 1, 2, 2]
+
+
+def answer(text):
+    return Message.model_validate(
+        {
+            "id": "msg_1",
+            "object": "thread.message",
+            "created_at": 0,
+            "thread_id": "thread_1",
+            "assistant_id": "asst_1",
+            "role": "assistant",
+            "status": "completed",
+            "attachments": [],
+            "metadata": {},
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        }
+    )
+
+
+def test_unusable_answers_fail_the_save():
+    with pytest.raises(Exception, match="Invalid article"):
+        asyncio.run(save_to_database("abcd1234", answer("Sorry, I cannot help with that.")))
+
+    article = {
+        "language": "xx",
+        "title": "Tides",
+        "perex": "",
+        "paragraphs": [],
+        "keywords": [],
+        "image_prompt": "",
+        "twitter": "",
+    }
+    with pytest.raises(Exception, match="Unknown language: xx"):
+        asyncio.run(save_to_database("abcd1234", answer(json.dumps(article))))
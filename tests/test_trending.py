@@ -0,0 +1,126 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import models.responses as responses
+from db.languages import language_registry
+from db.models import Article, Base, Language
+from db.trending import RESCALE_HALF_LIVES, TrendingTracker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def item(article_id: uuid.UUID) -> responses.ArticleTeaser:
+    return responses.ArticleTeaser(publicId=article_id.hex[:8], title=None, imageUrl=None, url="/")
+
+
+def ranking(tracker: TrendingTracker, language_id: uuid.UUID, k: int = 10):
+    return [teaser.publicId for teaser in tracker.top(language_id, k)]
+
+
+def test_recent_visits_outrank_older_ones():
+    clock = FakeClock()
+    tracker = TrendingTracker(half_life=60, capacity=10, clock=clock)
+    language_id, old, new = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    for _ in range(3):
+        tracker.record(language_id, old, item(old))
+
+    # three visits two half-lives ago weigh 0.75 now, less than a single fresh one
+    clock.now = 120
+    tracker.record(language_id, new, item(new))
+
+    assert ranking(tracker, language_id) == [new.hex[:8], old.hex[:8]]
+    assert ranking(tracker, uuid.uuid4()) == []
+
+
+def test_newcomer_takes_over_the_lowest_score_when_full():
+    tracker = TrendingTracker(half_life=60, capacity=2, clock=FakeClock())
+    language_id = uuid.uuid4()
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    for article_id, visits in ((a, 3), (b, 1), (c, 1)):
+        for _ in range(visits):
+            tracker.record(language_id, article_id, item(article_id))
+
+    assert ranking(tracker, language_id) == [a.hex[:8], c.hex[:8]]
+
+
+def test_scores_are_rescaled_before_they_overflow():
+    clock = FakeClock()
+    tracker = TrendingTracker(half_life=1, capacity=10, clock=clock)
+    language_id, old, new = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    tracker.record(language_id, old, item(old))
+    tracker.record(language_id, old, item(old))
+    for step in range(1, 20):
+        clock.now = step * RESCALE_HALF_LIVES * 0.9
+        tracker.record(language_id, new, item(new))
+
+    assert ranking(tracker, language_id) == [new.hex[:8], old.hex[:8]]
+
+
+def test_reconcile_adds_visits_flushed_by_other_workers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+
+    with sessionmaker(bind=engine)() as db:
+        language = Language(code="en", name="English")
+        db.add(language)
+        db.flush()
+        articles = [
+            Article(short_id=f"a{i:07d}", title=f"Article {i}", lang_id=language.id, visited=0)
+            for i in range(2)
+        ]
+        db.add_all(articles)
+        db.flush()
+        article_ids = [article.id for article in articles]
+        db.commit()
+        language_registry.load(db)
+        language_id = language.id
+
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"))
+    session_factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+    tracker = TrendingTracker(half_life=3600, capacity=10)
+
+    def visit(article_id: uuid.UUID, count: int):
+        with engine.begin() as connection:
+            connection.execute(
+                Article.__table__.update()
+                .where(Article.__table__.c.id == article_id)
+                .values(visited=Article.__table__.c.visited + count, last_visit=datetime.now())
+            )
+
+    async def reconcile():
+        async with session_factory() as db:
+            return await tracker.reconcile(db)
+
+    async def run():
+        # an article's first reconcile only learns its baseline
+        visit(article_ids[0], 1)
+        visit(article_ids[1], 1)
+        assert await reconcile() == 0
+
+        # one visit was this worker's own, the other five came from elsewhere
+        tracker.record(language_id, article_ids[1], item(article_ids[1]))
+        visit(article_ids[1], 6)
+        visit(article_ids[0], 2)
+        assert await reconcile() == 7
+
+        await async_engine.dispose()
+
+    asyncio.run(run())
+    engine.dispose()
+
+    assert ranking(tracker, language_id) == ["a0000001", "a0000000"]